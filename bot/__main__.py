@@ -0,0 +1,168 @@
+"""
+Command line entry point: python -m bot <command>
+
+Commands:
+    init-db      Create database tables
+    migrate      Convert stored timestamps to integer UTC epoch seconds
+    maintenance  Apply the retention policy (downsample, expire logs, vacuum)
+    rebuild-cohorts  Rebuild follower cohort tables from recorded events
+    track-once   Run a single tracking cycle
+    run          Run scheduled tracking
+    export       Export history (see python -m bot export --help)
+
+Heavy dependencies (instaloader, schedule, python-telegram-bot) are only
+imported by the commands that need them, so init-db and export start fast.
+"""
+
+import sys
+import argparse
+import logging
+
+logger = logging.getLogger('bot')
+
+def cmd_init_db(args):
+    """Create database tables"""
+    from .db import init_db
+    init_db()
+    print("Database initialized")
+    return 0
+
+def cmd_migrate(args):
+    """Convert stored timestamps to epoch seconds (every shard in sharded mode)"""
+    from . import db
+    from .db import init_db, is_sharded, list_shard_accounts, use_account, migrate_timestamps
+    from .logging_setup import setup_logging
+    setup_logging('tracker')
+    # Do all of the conversion below, with the requested batch size
+    db.MIGRATION_STARTUP_BATCHES = 0
+    init_db()
+
+    accounts = list_shard_accounts() if is_sharded() else []
+    for account in (accounts or [None]):
+        with use_account(account):
+            migrate_timestamps(args.batch_size)
+    print(f"Timestamps migrated ({len(accounts) or 1} database{'s' if len(accounts) > 1 else ''})")
+    return 0
+
+def cmd_maintenance(args):
+    """Apply the retention policy (every shard in sharded mode)"""
+    from .db import init_db, is_sharded, list_shard_accounts, use_account
+    from .maintenance import run_maintenance
+    from .logging_setup import setup_logging
+    setup_logging('tracker')
+    init_db()
+
+    ok = True
+    for account in (list_shard_accounts() if is_sharded() else [None]):
+        with use_account(account):
+            stats = run_maintenance(full_vacuum=args.full_vacuum)
+        if stats is None:
+            ok = False
+        else:
+            print(f"{account or 'database'}: {stats}")
+    return 0 if ok else 1
+
+def cmd_rebuild_cohorts(args):
+    """Rebuild cohort tables from follower events"""
+    from .config import INSTAGRAM_USERNAME
+    from .db import init_db, rebuild_cohorts, use_account
+    init_db()
+
+    account = args.account or INSTAGRAM_USERNAME
+    if not account:
+        print("No account given - pass --account or set INSTAGRAM_USERNAME", file=sys.stderr)
+        return 1
+    with use_account(account):
+        replayed = rebuild_cohorts(account)
+    print(f"Cohorts rebuilt for {account} from {replayed} events")
+    return 0
+
+def _create_tracker(args):
+    from .config import INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD
+    from .tracker import InstagramTracker
+
+    username = args.username or INSTAGRAM_USERNAME
+    password = args.password or INSTAGRAM_PASSWORD
+    if not username or not password:
+        print("Instagram credentials missing - set INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD", file=sys.stderr)
+        return None
+    return InstagramTracker(username, password)
+
+def cmd_track_once(args):
+    """Run a single tracking cycle"""
+    from .db import init_db
+    from .logging_setup import setup_logging
+    setup_logging('tracker')
+    init_db()
+
+    tracker = _create_tracker(args)
+    if tracker is None:
+        return 1
+    return 0 if tracker.run_once() else 1
+
+def cmd_run(args):
+    """Run scheduled tracking"""
+    from .config import TRACKING_INTERVAL
+    from .db import init_db
+    from .logging_setup import setup_logging
+    setup_logging('tracker')
+    init_db()
+
+    tracker = _create_tracker(args)
+    if tracker is None:
+        return 1
+    tracker.run_scheduled(args.interval or TRACKING_INTERVAL)
+    return 0
+
+def cmd_export(args):
+    """Export history"""
+    from .export import main as export_main
+    return export_main(args.export_args, prog='python -m bot export')
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m bot', description='Instagram Analytics Bot')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('init-db', help='Create database tables').set_defaults(func=cmd_init_db)
+
+    migrate = subparsers.add_parser('migrate', help='Convert stored timestamps to epoch seconds')
+    migrate.add_argument('--batch-size', type=int, default=5000, help='Rows per transaction (default: 5000)')
+    migrate.set_defaults(func=cmd_migrate)
+
+    maintenance = subparsers.add_parser('maintenance', help='Apply the retention policy')
+    maintenance.add_argument('--full-vacuum', action='store_true',
+                             help='Run a one-time VACUUM to enable incremental vacuum on older databases')
+    maintenance.set_defaults(func=cmd_maintenance)
+
+    cohorts = subparsers.add_parser('rebuild-cohorts', help='Rebuild follower cohort tables from recorded events')
+    cohorts.add_argument('--account', help='Instagram account (default: INSTAGRAM_USERNAME)')
+    cohorts.set_defaults(func=cmd_rebuild_cohorts)
+
+    for name, func, help_text in (('track-once', cmd_track_once, 'Run a single tracking cycle'),
+                                  ('run', cmd_run, 'Run scheduled tracking')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--username', help='Instagram username (default: INSTAGRAM_USERNAME)')
+        sub.add_argument('--password', help='Instagram password (default: INSTAGRAM_PASSWORD)')
+        if name == 'run':
+            sub.add_argument('--interval', type=int, help='Seconds between runs (default: TRACKING_INTERVAL)')
+        sub.set_defaults(func=func)
+
+    subparsers.add_parser('export', help='Export history', add_help=False).set_defaults(func=cmd_export)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Everything after "export" belongs to the export command's own parser
+    export_args = []
+    if 'export' in argv:
+        index = argv.index('export')
+        if all(arg.startswith('-') for arg in argv[:index]):
+            argv, export_args = argv[:index + 1], argv[index + 1:]
+
+    args = build_parser().parse_args(argv)
+    args.export_args = export_args
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import json
+import logging
+from collections import deque
+from .db import (
+    get_alert_rules, get_alert_windows, save_alert_checkpoint,
+    get_follower_samples_since, get_setting, now_epoch
+)
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('net_change', 'growth_rate')
+OPERATORS = ('<', '>')
+
+# Each window keeps at most this many buckets, so memory and checkpoint size
+# are bounded regardless of window length or sampling interval
+WINDOW_BUCKETS = 60
+
+class SlidingWindow:
+    """Follower counts over a trailing time window, in fixed-width buckets.
+
+    Each bucket keeps the first and last sample it saw. Adding a sample and
+    reading the window's change are O(1) amortized; the oldest value is
+    accurate to one bucket width (window / WINDOW_BUCKETS).
+    """
+    def __init__(self, window_seconds, buckets=None):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = max(window_seconds // WINDOW_BUCKETS, 1)
+        # Each bucket: [bucket_start, first_count, last_count]
+        self.buckets = deque(buckets or [])
+
+    def add(self, timestamp, count):
+        bucket_start = timestamp - timestamp % self.bucket_seconds
+        if self.buckets and self.buckets[-1][0] == bucket_start:
+            self.buckets[-1][2] = count
+        elif not self.buckets or bucket_start > self.buckets[-1][0]:
+            self.buckets.append([bucket_start, count, count])
+
+        cutoff = timestamp - self.window_seconds
+        while self.buckets and self.buckets[0][0] + self.bucket_seconds <= cutoff:
+            self.buckets.popleft()
+
+    def net_change(self):
+        if not self.buckets:
+            return 0
+        return self.buckets[-1][2] - self.buckets[0][1]
+
+    def growth_rate(self):
+        if not self.buckets or self.buckets[0][1] <= 0:
+            return 0.0
+        return self.net_change() / self.buckets[0][1] * 100
+
+    def covers_half(self):
+        """Whether the samples span at least half the window"""
+        return bool(self.buckets) and self.buckets[-1][0] - self.buckets[0][0] >= self.window_seconds // 2
+
+    def to_state(self):
+        return json.dumps(list(self.buckets))
+
+    @classmethod
+    def from_state(cls, window_seconds, state):
+        return cls(window_seconds, [list(bucket) for bucket in json.loads(state)])
+
+def rule_matches(rule, value):
+    """Whether a metric value satisfies a rule's condition"""
+    if rule['operator'] == '<':
+        return value < rule['threshold']
+    return value > rule['threshold']
+
+def describe_rule(rule):
+    """Human readable rule condition"""
+    unit = '%' if rule['metric'] == 'growth_rate' else ' followers'
+    hours = rule['window_seconds'] / 3600
+    span = f"{hours:g}h" if hours < 48 else f"{hours / 24:g} days"
+    return f"{rule['metric'].replace('_', ' ')} {rule['operator']} {rule['threshold']:g}{unit} over {span}"
+
+class AlertEngine:
+    """Evaluates an account's alert rules as follower samples arrive.
+
+    Rules sharing a window length share one SlidingWindow, so the cost per
+    sample is one bucket update per distinct window plus one comparison per
+    rule. Window state is checkpointed after every sample, so a restarted
+    tracker resumes without re-reading the followers table. A rule fires
+    when its condition becomes true and re-arms once it is false again.
+    """
+    def __init__(self, account):
+        self.account = account
+        self.rules = []
+        self.windows = {}
+        self.rules_version = None
+
+    def _rules_version(self):
+        return get_setting(f'alert_rules_version:{self.account}', '0')
+
+    def _load(self):
+        self.rules = get_alert_rules(self.account, enabled_only=True)
+        self.rules_version = self._rules_version()
+
+        states = get_alert_windows(self.account)
+        needed = {rule['window_seconds'] for rule in self.rules}
+        windows = {}
+        for window_seconds in needed:
+            if window_seconds in self.windows:
+                windows[window_seconds] = self.windows[window_seconds]
+            elif window_seconds in states:
+                windows[window_seconds] = SlidingWindow.from_state(window_seconds, states[window_seconds])
+            else:
+                windows[window_seconds] = None
+
+        # Windows with no checkpoint are warmed from history once
+        missing = [w for w, window in windows.items() if window is None]
+        if missing:
+            latest = max(missing)
+            samples = get_follower_samples_since(now_epoch() - latest)
+            for window_seconds in missing:
+                window = SlidingWindow(window_seconds)
+                for timestamp, count in samples:
+                    window.add(timestamp, count)
+                windows[window_seconds] = window
+        self.windows = windows
+
+    def observe(self, timestamp, follower_count):
+        """Add a follower sample and return the rules that just fired as (rule, value)"""
+        if self.rules_version is None or self._rules_version() != self.rules_version:
+            self._load()
+        if not self.rules:
+            return []
+
+        for window in self.windows.values():
+            window.add(timestamp, follower_count)
+
+        fired = []
+        active_changes = {}
+        for rule in self.rules:
+            window = self.windows[rule['window_seconds']]
+            if rule['metric'] == 'net_change':
+                value = window.net_change()
+                matched = rule_matches(rule, value)
+            else:
+                # A rate over a few minutes of data says little about a 7-day trend
+                value = window.growth_rate()
+                matched = window.covers_half() and rule_matches(rule, value)
+            if matched != bool(rule['active']):
+                rule['active'] = int(matched)
+                active_changes[rule['id']] = matched
+                if matched:
+                    fired.append((rule, value))
+
+        save_alert_checkpoint(
+            self.account,
+            {w: window.to_state() for w, window in self.windows.items()},
+            active_changes
+        )
+        return fired
@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 240))
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 128))
+
+class _InFlight:
+    """A fetch in progress that other callers can wait on"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class ProfileCache:
+    """TTL + LRU cache for Instagram profile metadata.
+
+    Concurrent requests for the same key share a single fetch, so only one
+    call to Instagram is made no matter how many threads ask at once.
+    """
+    def __init__(self, ttl=PROFILE_CACHE_TTL, max_size=PROFILE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(username):
+        return username.lower()
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_or_fetch(self, username, fetch, force=False):
+        """Return the cached value or call fetch() once to load it.
+
+        With force=True the cached value is ignored and refetched, but a
+        fetch already in progress for the same key is still shared.
+        """
+        key = self._key(username)
+        with self._lock:
+            if not force:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[1]
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            with self._lock:
+                self._store(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.event.set()
+
+# Global profile cache instance
+_profile_cache = None
+
+def get_profile_cache():
+    """Get global profile cache instance"""
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ProfileCache()
+    return _profile_cache
+
+def reset_profile_cache():
+    """Drop the global profile cache (e.g. in a freshly forked worker)"""
+    global _profile_cache
+    _profile_cache = None
+
+def get_profile(context, username, force=False):
+    """Get an instaloader Profile through the shared cache"""
+    import instaloader
+
+    def fetch():
+        logger.debug(f"Fetching profile metadata for {username}")
+        return instaloader.Profile.from_username(context, username)
+
+    return get_profile_cache().get_or_fetch(username, fetch, force=force)
@@ -0,0 +1,70 @@
+import logging
+from .db import get_cohort_data, week_start_epoch, format_timestamp, now_epoch
+
+logger = logging.getLogger(__name__)
+
+WEEK = 7 * 86400
+
+def _survival(size, losses, cohort_week, age):
+    """Followers remaining at the end of each week 0..age for one cohort"""
+    remaining = []
+    left = size
+    for weeks_since in range(age + 1):
+        left -= losses.get((cohort_week, weeks_since), 0)
+        remaining.append(left)
+    return remaining
+
+def _median_lifetime(size, remaining):
+    """First week by which half the cohort had left, or None if not reached yet"""
+    for weeks_since, left in enumerate(remaining):
+        if left <= size / 2:
+            return weeks_since
+    return None
+
+def cohort_retention(account, weeks=12, tz=None):
+    """Weekly cohort retention matrix and survival curve for an account.
+
+    Each cohort is the followers gained in one week. Reads only the
+    precomputed cohort tables, so the cost depends on the number of
+    cohorts, not on the length of the follow/unfollow history.
+    """
+    now = now_epoch()
+    current_week = week_start_epoch(now, tz)
+    since_week = week_start_epoch(now - (weeks - 1) * WEEK, tz)
+    sizes, losses = get_cohort_data(account, since_week)
+
+    cohorts = []
+    # Pooled survival: week -> [remaining, size] over cohorts that old
+    pooled = {}
+    for cohort_week in sorted(sizes):
+        size = sizes[cohort_week]
+        # Rounded so DST shifts don't change a cohort's age
+        age = round((current_week - cohort_week) / WEEK)
+        remaining = _survival(size, losses, cohort_week, age)
+        for weeks_since, left in enumerate(remaining):
+            totals = pooled.setdefault(weeks_since, [0, 0])
+            totals[0] += left
+            totals[1] += size
+        cohorts.append({
+            'week': format_timestamp(cohort_week, tz),
+            'size': size,
+            'remaining': remaining,
+            'retention': [round(left / size * 100, 1) if size else 0.0 for left in remaining],
+            'median_lifetime_weeks': _median_lifetime(size, remaining),
+        })
+
+    survival = [
+        round(pooled[weeks_since][0] / pooled[weeks_since][1] * 100, 1) if pooled[weeks_since][1] else 0.0
+        for weeks_since in sorted(pooled)
+    ]
+    median = None
+    for weeks_since, value in enumerate(survival):
+        if value <= 50:
+            median = weeks_since
+            break
+
+    return {
+        'cohorts': cohorts,
+        'survival': survival,
+        'median_lifetime_weeks': median,
+    }
@@ -0,0 +1,63 @@
+import os
+
+# Load .env if python-dotenv is available
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+# Instagram credentials (used by the command line tracker)
+INSTAGRAM_USERNAME = os.environ.get('INSTAGRAM_USERNAME', '')
+INSTAGRAM_PASSWORD = os.environ.get('INSTAGRAM_PASSWORD', '')
+
+# Telegram bot settings (optional)
+TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')
+
+# Dashboard logins (Instagram usernames, comma separated) allowed to see
+# every tracked account's stats in /api/accounts/overview
+ADMIN_ACCOUNTS = {name.strip().lower() for name in os.environ.get('ADMIN_ACCOUNTS', '').split(',') if name.strip()}
+
+# Tracking settings
+TRACKING_INTERVAL = int(os.environ.get('TRACKING_INTERVAL', 300))
+
+# Maximum followers returned by InstagramTracker.get_followers_list (0 = no limit)
+FOLLOWERS_LIST_LIMIT = int(os.environ.get('FOLLOWERS_LIST_LIMIT', 100))
+
+# Full follower list snapshot interval in seconds (0 = disabled). Each
+# snapshot records per-follower follow/unfollow events and feeds cohorts.
+FOLLOWER_SNAPSHOT_INTERVAL = int(os.environ.get('FOLLOWER_SNAPSHOT_INTERVAL', 21600))
+
+# Followers/followees graph snapshot interval in seconds (0 = disabled).
+# Enumerates both full lists, so keep it infrequent for large accounts.
+GRAPH_TRACKING_INTERVAL = int(os.environ.get('GRAPH_TRACKING_INTERVAL', 0))
+
+# Post engagement tracking (0 disables the scheduled job)
+POST_TRACKING_INTERVAL = int(os.environ.get('POST_TRACKING_INTERVAL', 3600))
+POSTS_REFRESH_PER_CYCLE = int(os.environ.get('POSTS_REFRESH_PER_CYCLE', 5))
+POSTS_INITIAL_CRAWL = int(os.environ.get('POSTS_INITIAL_CRAWL', 24))
+
+# Shared Instagram request budget (token bucket used by every process)
+RATE_LIMIT_DB = os.environ.get('RATE_LIMIT_DB', 'ratelimit.db')
+INSTAGRAM_REQUESTS_PER_HOUR = float(os.environ.get('INSTAGRAM_REQUESTS_PER_HOUR', 180))
+INSTAGRAM_BURST = int(os.environ.get('INSTAGRAM_BURST', 20))
+# Tokens background jobs must leave for interactive requests
+INTERACTIVE_RESERVE = int(os.environ.get('INTERACTIVE_RESERVE', 5))
+# Longest a request waits for budget before it is rejected (seconds)
+INTERACTIVE_MAX_WAIT = float(os.environ.get('INTERACTIVE_MAX_WAIT', 15))
+BACKGROUND_MAX_WAIT = float(os.environ.get('BACKGROUND_MAX_WAIT', 900))
+
+# Retention (days, 0 = keep forever). Follower samples are kept raw for
+# RAW_RETENTION_DAYS, then one per hour until HOURLY_RETENTION_DAYS, then
+# one per day.
+RAW_RETENTION_DAYS = int(os.environ.get('RAW_RETENTION_DAYS', 30))
+HOURLY_RETENTION_DAYS = int(os.environ.get('HOURLY_RETENTION_DAYS', 365))
+TRACKING_LOG_RETENTION_DAYS = int(os.environ.get('TRACKING_LOG_RETENTION_DAYS', 90))
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', 86400))
+# Free pages released per maintenance run by incremental vacuum
+VACUUM_PAGES = int(os.environ.get('VACUUM_PAGES', 2000))
+
+# Logging
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_DIR = os.environ.get('LOG_DIR', 'logs')
@@ -1,31 +1,197 @@
 import sqlite3
 import os
-from datetime import datetime
+import re
+import glob
+import time
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
 DATABASE_PATH = os.environ.get('DATABASE_PATH', 'analytics.db')
 
+# Storage mode: 'single' keeps everything in DATABASE_PATH, 'sharded' keeps
+# one SQLite file per account in SHARD_DIR so accounts don't share a write lock
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'single')
+SHARD_DIR = os.environ.get('SHARD_DIR', 'shards')
+# SQLite attaches at most 10 databases per connection by default
+SHARD_ATTACH_GROUP = int(os.environ.get('SHARD_ATTACH_GROUP', 8))
+SQLITE_MAX_ATTACHED = 10
+
+# Timestamps are stored as integer UTC epoch seconds. Naive datetimes passed
+# to the helpers below are interpreted as local time.
+TIMESTAMP_COLUMNS = {
+    'followers': ['timestamp'],
+    'follower_changes': ['timestamp'],
+    'tracking_log': ['timestamp'],
+    'follower_events': ['timestamp'],
+    'posts': ['taken_at', 'last_refreshed', 'next_refresh'],
+    'post_metrics': ['timestamp'],
+    'settings': ['updated_at'],
+    'alert_rules': ['created_at'],
+}
+# Columns older versions stored that nothing reads; dropped by
+# drop_legacy_columns during 'python -m bot maintenance --full-vacuum'
+LEGACY_COLUMNS = {
+    'followers': ['created_at'],
+    'follower_changes': ['created_at'],
+    'tracking_log': ['created_at'],
+}
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 5000))
+# Batches converted when a database is opened at startup; the rest is left to
+# 'python -m bot migrate' or the maintenance job (0 = none at startup)
+MIGRATION_STARTUP_BATCHES = int(os.environ.get('MIGRATION_STARTUP_BATCHES', 20))
+
+def now_epoch():
+    """Current time as UTC epoch seconds"""
+    return int(time.time())
+
+def to_epoch(value):
+    """Convert a datetime (naive = local time) to UTC epoch seconds"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    return int(value.timestamp())
+
+def from_epoch(value, tz=None):
+    """Convert UTC epoch seconds to an aware datetime in tz (default: local zone)"""
+    return datetime.fromtimestamp(value, timezone.utc).astimezone(tz)
+
+def epoch_sql(column):
+    """SQL expression reading a timestamp column as epoch seconds, converting
+    text values the timestamp migration has not reached yet (local time)"""
+    return (f"CASE WHEN typeof({column}) = 'text' "
+            f"THEN CAST(strftime('%s', {column}, 'utc') AS INTEGER) ELSE {column} END")
+
+def format_timestamp(value, tz=None):
+    """Format a stored timestamp as ISO 8601 with UTC offset"""
+    if value is None or isinstance(value, str):
+        return value
+    return from_epoch(value, tz).isoformat()
+
+def utc_offset_seconds(tz=None):
+    """Current UTC offset of tz (default: local zone) in seconds"""
+    return int(datetime.now(timezone.utc).astimezone(tz).utcoffset().total_seconds())
+
+def day_start_epoch(tz=None):
+    """Epoch seconds of the most recent midnight in tz (default: local zone)"""
+    now = datetime.now(timezone.utc).astimezone(tz)
+    return int(now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+def week_start_epoch(value, tz=None):
+    """Epoch seconds of the Monday midnight (in tz) starting the week of an epoch time"""
+    local = from_epoch(value, tz)
+    monday = local - timedelta(days=local.weekday())
+    return int(monday.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+def _rows_with_timestamps(results, *columns, tz=None):
+    """Convert result rows to dicts with epoch columns formatted as ISO strings"""
+    rows = []
+    for row in results:
+        item = dict(row)
+        for column in columns:
+            if column in item:
+                item[column] = format_timestamp(item[column], tz)
+        rows.append(item)
+    return rows
+
+_current_account = contextvars.ContextVar('current_account', default=None)
+_initialized_shards = set()
+
+def set_current_account(account):
+    """Route database access in this context to an account's shard; returns a reset token"""
+    return _current_account.set(account)
+
+def reset_current_account(token):
+    """Undo set_current_account"""
+    _current_account.reset(token)
+
+@contextmanager
+def use_account(account):
+    """Route database access inside the block to an account's shard"""
+    token = set_current_account(account)
+    try:
+        yield
+    finally:
+        reset_current_account(token)
+
+def is_sharded():
+    """Whether per-account shard storage is enabled"""
+    return STORAGE_MODE == 'sharded'
+
+def get_shard_path(account):
+    """Get the shard file for an account"""
+    name = re.sub(r'[^a-z0-9._-]', '_', account.lower())
+    return os.path.join(SHARD_DIR, f'{name}.db')
+
+def list_shard_accounts():
+    """List accounts that have a shard file"""
+    return sorted(os.path.splitext(os.path.basename(path))[0]
+                  for path in glob.glob(os.path.join(SHARD_DIR, '*.db')))
+
+def get_db_path():
+    """Get the database file for the current account"""
+    account = _current_account.get()
+    if is_sharded() and account:
+        return get_shard_path(account)
+    return DATABASE_PATH
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    """Get database connection (the current account's shard in sharded mode)"""
+    path = get_db_path()
+    if path != DATABASE_PATH and path not in _initialized_shards:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path)
+        create_schema(conn)
+        conn.close()
+        _initialized_shards.add(path)
+        migrate_timestamps(max_batches=MIGRATION_STARTUP_BATCHES)
+    conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     return conn
 
 def init_db():
     """Initialize database with required tables"""
     conn = get_db_connection()
+    create_schema(conn)
+    conn.close()
+    migrate_timestamps(max_batches=MIGRATION_STARTUP_BATCHES)
+    logger.info("Database initialized successfully")
+
+def _upgrade_username_keyed_tables(conn):
+    """Set aside follower tables from versions that keyed followers by username.
+
+    Old events are kept as follower_events_by_username; the follower set
+    and cohorts are derived data and are rebuilt from the next snapshot.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(follower_events)')]
+    if 'follower_username' not in columns:
+        return
+    logger.warning("Follower events were keyed by username - keeping them as "
+                   "follower_events_by_username and starting user-id events")
+    for index in ('account_type_time', 'account_user', 'account_type_user'):
+        conn.execute(f'DROP INDEX IF EXISTS idx_follower_events_{index}')
+    conn.execute('ALTER TABLE follower_events RENAME TO follower_events_by_username')
+    for table in ('current_followers', 'cohort_members', 'cohort_sizes', 'cohort_losses'):
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+    conn.execute("DELETE FROM settings WHERE key LIKE 'followers_snapshot:%'")
+
+def create_schema(conn):
+    """Create all tables and indexes on a connection"""
+    # Only takes effect on a new database (see bot.maintenance.vacuum)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
     
     # Create followers table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS followers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
+            timestamp INTEGER NOT NULL,
             follower_count INTEGER NOT NULL,
             following_count INTEGER NOT NULL,
-            posts_count INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            posts_count INTEGER NOT NULL
         )
     ''')
     
@@ -33,11 +199,10 @@ def init_db():
     conn.execute('''
         CREATE TABLE IF NOT EXISTS follower_changes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
+            timestamp INTEGER NOT NULL,
             change_type TEXT NOT NULL, -- 'gain' or 'loss'
             count INTEGER NOT NULL,
-            message TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            message TEXT
         )
     ''')
     
@@ -46,7 +211,7 @@ def init_db():
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
             value TEXT NOT NULL,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            updated_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
         )
     ''')
     
@@ -54,34 +219,179 @@ def init_db():
     conn.execute('''
         CREATE TABLE IF NOT EXISTS tracking_log (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
+            timestamp INTEGER NOT NULL,
             status TEXT NOT NULL, -- 'success', 'error', 'warning'
             message TEXT,
-            details TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            details TEXT
+        )
+    ''')
+    
+    # Time indexes for range scans
+    for table in ('followers', 'follower_changes', 'tracking_log'):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)')
+    
+    _upgrade_username_keyed_tables(conn)
+    
+    # Create follower_events table (one row per follow/unfollow). Keyed by
+    # Instagram user id so renames don't look like unfollows; usernames
+    # are looked up in instagram_users
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS follower_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL, -- 'follow' or 'unfollow'
+            timestamp INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_follower_events_account_type_time
+        ON follower_events (account, event_type, timestamp)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_follower_events_account_user
+        ON follower_events (account, user_id, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_follower_events_account_type_user
+        ON follower_events (account, event_type, user_id, timestamp)
+    ''')
+    
+    # Create cohort tables (followers grouped by the week they followed).
+    # cohort_members holds still-following members; sizes and losses are
+    # running counters so the retention matrix never scans follower_events
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_members (
+            account TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            cohort_week INTEGER NOT NULL,
+            PRIMARY KEY (account, user_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_sizes (
+            account TEXT NOT NULL,
+            cohort_week INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (account, cohort_week)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_losses (
+            account TEXT NOT NULL,
+            cohort_week INTEGER NOT NULL,
+            weeks_since INTEGER NOT NULL,
+            lost INTEGER NOT NULL,
+            PRIMARY KEY (account, cohort_week, weeks_since)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Create connection_snapshots table (sorted int64 user ids packed in a blob)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS connection_snapshots (
+            account TEXT NOT NULL,
+            kind TEXT NOT NULL, -- 'followers', 'followees' or a derived relation
+            user_ids BLOB NOT NULL,
+            count INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL,
+            PRIMARY KEY (account, kind)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Create instagram_users table (user id -> username lookup)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS instagram_users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL
         )
     ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_instagram_users_username
+        ON instagram_users (username)
+    ''')
+    
+    # Create alert_rules table (user-defined sliding-window alerts)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alert_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account TEXT NOT NULL,
+            name TEXT NOT NULL,
+            metric TEXT NOT NULL, -- 'net_change' or 'growth_rate'
+            window_seconds INTEGER NOT NULL,
+            operator TEXT NOT NULL, -- '<' or '>'
+            threshold REAL NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            active INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER DEFAULT (CAST(strftime('%s','now') AS INTEGER))
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_alert_rules_account
+        ON alert_rules (account, enabled)
+    ''')
+    
+    # Create alert_windows table (checkpointed sliding-window state)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alert_windows (
+            account TEXT NOT NULL,
+            window_seconds INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (account, window_seconds)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Create posts table (one row per tracked post)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            shortcode TEXT PRIMARY KEY,
+            account TEXT NOT NULL,
+            taken_at INTEGER NOT NULL,
+            caption TEXT,
+            last_refreshed INTEGER NOT NULL,
+            next_refresh INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_posts_account_next_refresh
+        ON posts (account, next_refresh)
+    ''')
+    
+    # Create post_metrics table (engagement snapshots per post)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS post_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shortcode TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            likes INTEGER NOT NULL,
+            comments INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_post_metrics_shortcode_time
+        ON post_metrics (shortcode, timestamp)
+    ''')
     
     conn.commit()
-    conn.close()
-    logger.info("Database initialized successfully")
 
 def save_follower_data(follower_count, following_count, posts_count):
-    """Save follower data to database"""
+    """Save follower data to database and return the stored timestamp"""
+    timestamp = now_epoch()
     conn = get_db_connection()
     conn.execute('''
         INSERT INTO followers (timestamp, follower_count, following_count, posts_count)
         VALUES (?, ?, ?, ?)
-    ''', (datetime.now(), follower_count, following_count, posts_count))
+    ''', (timestamp, follower_count, following_count, posts_count))
     conn.commit()
     conn.close()
+    return timestamp
 
 def get_latest_follower_count():
     """Get the latest follower count"""
     conn = get_db_connection()
     result = conn.execute('''
         SELECT follower_count FROM followers 
-        ORDER BY timestamp DESC LIMIT 1
+        ORDER BY id DESC LIMIT 1
     ''').fetchone()
     conn.close()
     return result['follower_count'] if result else 0
@@ -92,62 +402,106 @@ def save_follower_change(change_type, count, message):
     conn.execute('''
         INSERT INTO follower_changes (timestamp, change_type, count, message)
         VALUES (?, ?, ?, ?)
-    ''', (datetime.now(), change_type, count, message))
+    ''', (now_epoch(), change_type, count, message))
     conn.commit()
     conn.close()
 
-def get_recent_changes(limit=10):
-    """Get recent follower changes"""
+def get_recent_changes(limit=10, tz=None, raw_timestamps=False):
+    """Get recent follower changes (timestamps as ISO strings in tz, or epoch seconds if raw)"""
     conn = get_db_connection()
     results = conn.execute('''
         SELECT * FROM follower_changes 
-        ORDER BY timestamp DESC LIMIT ?
+        ORDER BY id DESC LIMIT ?
     ''', (limit,)).fetchall()
     conn.close()
-    return [dict(row) for row in results]
+    if raw_timestamps:
+        return [dict(row) for row in results]
+    return _rows_with_timestamps(results, 'timestamp', tz=tz)
+
+def utc_offset_segments(start, end, tz=None):
+    """UTC offsets of tz over [start, end] as [(from_epoch, offset_seconds)].
+
+    A new segment starts at each DST transition, found to the second by
+    bisection; assumes at most one transition per day.
+    """
+    def offset(value):
+        return int(from_epoch(value, tz).utcoffset().total_seconds())
 
-def get_follower_timeline(days=30):
-    """Get follower timeline for the last N days"""
+    segments = [(start, offset(start))]
+    day = start
+    while day < end:
+        next_day = min(day + 86400, end)
+        if offset(next_day) != segments[-1][1]:
+            low, high = day, next_day
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset(middle) == segments[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            segments.append((high, offset(high)))
+        day = next_day
+    return segments
+
+def _local_time_sql(column, segments):
+    """SQL expression shifting an epoch column to local time, per DST segment"""
+    if len(segments) == 1:
+        return f'{column} + ?', [segments[0][1]]
+    cases = []
+    params = []
+    for start, offset in reversed(segments[1:]):
+        cases.append(f'WHEN {column} >= ? THEN ?')
+        params.extend((start, offset))
+    return f"{column} + CASE {' '.join(cases)} ELSE ? END", params + [segments[0][1]]
+
+def get_follower_timeline(days=30, tz=None):
+    """Get follower timeline for the last N days, grouped by day in tz"""
+    now = now_epoch()
+    since = now - days * 86400
+    # Each row is shifted by the offset in effect at its own time, so days
+    # across a DST change are bucketed correctly
+    local_time, offset_params = _local_time_sql('timestamp', utc_offset_segments(since, now, tz))
     conn = get_db_connection()
-    results = conn.execute('''
-        SELECT DATE(timestamp) as date, 
+    results = conn.execute(f'''
+        SELECT DATE({local_time}, 'unixepoch') as date, 
                MAX(follower_count) as followers,
                MAX(following_count) as following,
                MAX(posts_count) as posts
         FROM followers 
-        WHERE timestamp >= datetime('now', ? || ' days')
-        GROUP BY DATE(timestamp)
+        WHERE timestamp >= ?
+        GROUP BY date
         ORDER BY date ASC
-    ''', (f'-{days}',)).fetchall()
+    ''', (*offset_params, since)).fetchall()
     conn.close()
     return [dict(row) for row in results]
 
-def get_today_stats():
-    """Get today's statistics"""
+def get_today_stats(tz=None):
+    """Get today's statistics (today = since midnight in tz, default local zone)"""
     conn = get_db_connection()
+    day_start = day_start_epoch(tz)
     
     # Get current count
     current = conn.execute('''
         SELECT follower_count, following_count, posts_count 
         FROM followers 
-        ORDER BY timestamp DESC LIMIT 1
+        ORDER BY id DESC LIMIT 1
     ''').fetchone()
     
     # Get start of day count
     start_of_day = conn.execute('''
         SELECT follower_count 
         FROM followers 
-        WHERE DATE(timestamp) = DATE('now')
+        WHERE timestamp >= ?
         ORDER BY timestamp ASC LIMIT 1
-    ''').fetchone()
+    ''', (day_start,)).fetchone()
     
     # Get changes today
     changes = conn.execute('''
         SELECT change_type, SUM(count) as total_count
         FROM follower_changes 
-        WHERE DATE(timestamp) = DATE('now')
+        WHERE timestamp >= ?
         GROUP BY change_type
-    ''').fetchall()
+    ''', (day_start,)).fetchall()
     
     conn.close()
     
@@ -176,7 +530,7 @@ def save_setting(key, value):
     conn.execute('''
         INSERT OR REPLACE INTO settings (key, value, updated_at)
         VALUES (?, ?, ?)
-    ''', (key, value, datetime.now()))
+    ''', (key, value, now_epoch()))
     conn.commit()
     conn.close()
 
@@ -195,16 +549,526 @@ def log_tracking_event(status, message, details=None):
     conn.execute('''
         INSERT INTO tracking_log (timestamp, status, message, details)
         VALUES (?, ?, ?, ?)
-    ''', (datetime.now(), status, message, details))
+    ''', (now_epoch(), status, message, details))
     conn.commit()
     conn.close()
 
-def get_tracking_logs(limit=50):
-    """Get recent tracking logs"""
+def get_tracking_logs(limit=50, tz=None):
+    """Get recent tracking logs (timestamps as ISO strings in tz)"""
     conn = get_db_connection()
     results = conn.execute('''
         SELECT * FROM tracking_log 
-        ORDER BY timestamp DESC LIMIT ?
+        ORDER BY id DESC LIMIT ?
     ''', (limit,)).fetchall()
     conn.close()
+    return _rows_with_timestamps(results, 'timestamp', tz=tz)
+
+def save_follower_snapshot(account, user_ids_blob, count, complete=True,
+                           new_followers=(), unfollowers=()):
+    """Store the packed follower id list with the follow/unfollow events it implies.
+
+    Snapshot, events and cohort counters are written in one transaction.
+    complete=False marks a list cut short by a limit, which later snapshots
+    must not be diffed against.
+    """
+    now = now_epoch()
+    conn = get_db_connection()
+    with conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO connection_snapshots (account, kind, user_ids, count, timestamp)
+            VALUES (?, 'followers', ?, ?, ?)
+        ''', (account, user_ids_blob, count, now))
+        conn.executemany('''
+            INSERT INTO follower_events (account, user_id, event_type, timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', [(account, user_id, 'follow', now) for user_id in new_followers] +
+             [(account, user_id, 'unfollow', now) for user_id in unfollowers])
+        _update_cohorts(conn, account, new_followers, unfollowers, now)
+        conn.execute('''
+            INSERT OR REPLACE INTO settings (key, value, updated_at)
+            VALUES (?, ?, ?)
+        ''', (f'followers_snapshot:{account}', 'complete' if complete else 'partial', now))
+    conn.close()
+    return now
+
+def _update_cohorts(conn, account, new_followers, unfollowers, now):
+    """Apply follows/unfollows to the cohort membership and counters"""
+    week = week_start_epoch(now)
+    if new_followers:
+        conn.executemany('''
+            INSERT OR REPLACE INTO cohort_members (account, user_id, cohort_week)
+            VALUES (?, ?, ?)
+        ''', [(account, user_id, week) for user_id in new_followers])
+        conn.execute('''
+            INSERT INTO cohort_sizes (account, cohort_week, size) VALUES (?, ?, ?)
+            ON CONFLICT(account, cohort_week) DO UPDATE SET size = size + excluded.size
+        ''', (account, week, len(new_followers)))
+    
+    if unfollowers:
+        # Only followers gained while tracking belong to a cohort
+        losses = {}
+        unfollowers = list(unfollowers)
+        for start in range(0, len(unfollowers), 500):
+            chunk = unfollowers[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f'''
+                SELECT cohort_week FROM cohort_members
+                WHERE account = ? AND user_id IN ({placeholders})
+            ''', (account, *chunk)):
+                weeks_since = (now - row['cohort_week']) // (7 * 86400)
+                key = (row['cohort_week'], weeks_since)
+                losses[key] = losses.get(key, 0) + 1
+        conn.executemany('''
+            INSERT INTO cohort_losses (account, cohort_week, weeks_since, lost) VALUES (?, ?, ?, ?)
+            ON CONFLICT(account, cohort_week, weeks_since) DO UPDATE SET lost = lost + excluded.lost
+        ''', [(account, cohort_week, weeks_since, lost)
+              for (cohort_week, weeks_since), lost in losses.items()])
+        conn.executemany('''
+            DELETE FROM cohort_members WHERE account = ? AND user_id = ?
+        ''', [(account, user_id) for user_id in unfollowers])
+
+def get_cohort_data(account, since_week=None):
+    """Get cohort sizes and per-week losses: ({week: size}, {(week, weeks_since): lost})"""
+    conn = get_db_connection()
+    sizes = conn.execute('''
+        SELECT cohort_week, size FROM cohort_sizes
+        WHERE account = ? AND cohort_week >= ?
+    ''', (account, since_week or 0)).fetchall()
+    losses = conn.execute('''
+        SELECT cohort_week, weeks_since, lost FROM cohort_losses
+        WHERE account = ? AND cohort_week >= ?
+    ''', (account, since_week or 0)).fetchall()
+    conn.close()
+    return ({row['cohort_week']: row['size'] for row in sizes},
+            {(row['cohort_week'], row['weeks_since']): row['lost'] for row in losses})
+
+def rebuild_cohorts(account, batch_size=5000):
+    """Rebuild cohort tables for an account by replaying follower_events.
+
+    Runs as one write transaction, so a tracker saving a snapshot meanwhile
+    waits for the rebuild instead of having its events lost or counted twice.
+    """
+    conn = get_db_connection()
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        for table in ('cohort_members', 'cohort_sizes', 'cohort_losses'):
+            conn.execute(f'DELETE FROM {table} WHERE account = ?', (account,))
+
+        # Replay one timestamp (tracking cycle) at a time, as the tracker wrote
+        # them, reading the events in id batches
+        batch_time, follows, unfollows = None, [], []
+        replayed = 0
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, user_id, event_type, timestamp FROM follower_events
+                WHERE account = ? AND id > ? ORDER BY id ASC LIMIT ?
+            ''', (account, last_id, batch_size)).fetchall()
+            for row in rows:
+                if row['timestamp'] != batch_time and (follows or unfollows):
+                    _update_cohorts(conn, account, follows, unfollows, batch_time)
+                    follows, unfollows = [], []
+                batch_time = row['timestamp']
+                (follows if row['event_type'] == 'follow' else unfollows).append(row['user_id'])
+            replayed += len(rows)
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]['id']
+        if follows or unfollows:
+            _update_cohorts(conn, account, follows, unfollows, batch_time)
+    conn.close()
+    return replayed
+
+def get_unfollowers_since(account, since, limit=50, before_id=None):
+    """Get unfollow events since a datetime, newest first.
+
+    Paginate by passing the last returned id as before_id.
+    """
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT e.id, e.user_id, u.username AS follower_username, e.timestamp
+        FROM follower_events e
+        LEFT JOIN instagram_users u ON u.user_id = e.user_id
+        WHERE e.account = ? AND e.event_type = 'unfollow' AND e.timestamp >= ?
+          AND e.id < ?
+        ORDER BY e.timestamp DESC, e.id DESC LIMIT ?
+    ''', (account, to_epoch(since), before_id if before_id is not None else 2 ** 63 - 1, limit)).fetchall()
+    conn.close()
+    return _rows_with_timestamps(results, 'timestamp')
+
+def get_repeat_unfollowers(account, min_count=2, limit=50, after_user_id=None):
+    """Get users who unfollowed an account at least min_count times.
+
+    Ordered by user id; paginate by passing the last user_id as after_user_id.
+    """
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT r.user_id, u.username AS follower_username, r.unfollow_count, r.last_unfollow
+        FROM (
+            SELECT user_id, COUNT(*) as unfollow_count, MAX(timestamp) as last_unfollow
+            FROM follower_events
+            WHERE account = ? AND event_type = 'unfollow' AND user_id > ?
+            GROUP BY user_id
+            HAVING COUNT(*) >= ?
+            ORDER BY user_id ASC LIMIT ?
+        ) r
+        LEFT JOIN instagram_users u ON u.user_id = r.user_id
+        ORDER BY r.user_id ASC
+    ''', (account, after_user_id if after_user_id is not None else -2 ** 63, min_count, limit)).fetchall()
+    conn.close()
+    return _rows_with_timestamps(results, 'last_unfollow')
+
+def get_user_id(username):
+    """Look up the user id last seen with a username, or None"""
+    conn = get_db_connection()
+    result = conn.execute('''
+        SELECT user_id FROM instagram_users WHERE username = ?
+    ''', (username,)).fetchone()
+    conn.close()
+    return result['user_id'] if result else None
+
+def get_follower_history(account, user_id, limit=50, before_id=None):
+    """Get follow/unfollow history for one user, newest first"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT id, event_type, timestamp FROM follower_events
+        WHERE account = ? AND user_id = ? AND id < ?
+        ORDER BY id DESC LIMIT ?
+    ''', (account, user_id, before_id if before_id is not None else 2 ** 63 - 1, limit)).fetchall()
+    conn.close()
+    return _rows_with_timestamps(results, 'timestamp')
+
+def save_post_snapshot(account, shortcode, taken_at, caption, likes, comments, next_refresh):
+    """Insert or refresh a post and record an engagement snapshot"""
+    now = now_epoch()
+    conn = get_db_connection()
+    with conn:
+        conn.execute('''
+            INSERT INTO posts (shortcode, account, taken_at, caption, last_refreshed, next_refresh)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(shortcode) DO UPDATE SET
+                last_refreshed = excluded.last_refreshed,
+                next_refresh = excluded.next_refresh
+        ''', (shortcode, account, to_epoch(taken_at), caption, now, to_epoch(next_refresh)))
+        conn.execute('''
+            INSERT INTO post_metrics (shortcode, timestamp, likes, comments)
+            VALUES (?, ?, ?, ?)
+        ''', (shortcode, now, likes, comments))
+    conn.close()
+
+def get_posts_due_for_refresh(account, limit=5):
+    """Get posts whose next refresh time has passed, most overdue first"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT shortcode, taken_at, last_refreshed FROM posts
+        WHERE account = ? AND next_refresh <= ?
+        ORDER BY next_refresh ASC LIMIT ?
+    ''', (account, now_epoch(), limit)).fetchall()
+    conn.close()
     return [dict(row) for row in results]
+
+def postpone_post_refresh(shortcode, next_refresh):
+    """Move a post's next refresh without recording a snapshot (e.g. after a failed fetch)"""
+    conn = get_db_connection()
+    with conn:
+        conn.execute('UPDATE posts SET next_refresh = ? WHERE shortcode = ?',
+                     (to_epoch(next_refresh), shortcode))
+    conn.close()
+
+def get_post_engagement(account, limit=20):
+    """Get the latest engagement snapshot for the most recent posts"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT p.shortcode, p.taken_at, p.caption, m.likes, m.comments, m.timestamp as measured_at
+        FROM posts p
+        JOIN post_metrics m ON m.id = (
+            SELECT id FROM post_metrics WHERE shortcode = p.shortcode
+            ORDER BY timestamp DESC LIMIT 1
+        )
+        WHERE p.account = ?
+        ORDER BY p.taken_at DESC LIMIT ?
+    ''', (account, limit)).fetchall()
+    conn.close()
+    return _rows_with_timestamps(results, 'taken_at', 'measured_at')
+
+def get_post_metrics_history(account, shortcode):
+    """Get all engagement snapshots for one of an account's posts, oldest first"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT m.timestamp, m.likes, m.comments
+        FROM posts p
+        JOIN post_metrics m ON m.shortcode = p.shortcode
+        WHERE p.account = ? AND p.shortcode = ?
+        ORDER BY m.timestamp ASC
+    ''', (account, shortcode)).fetchall()
+    conn.close()
+    return _rows_with_timestamps(results, 'timestamp')
+
+def _bump_alert_rules_version(conn, account):
+    """Tell running alert engines to reload this account's rules"""
+    conn.execute('''
+        INSERT INTO settings (key, value, updated_at) VALUES (?, '1', ?)
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,
+                                       updated_at = excluded.updated_at
+    ''', (f'alert_rules_version:{account}', now_epoch()))
+
+def create_alert_rule(account, name, metric, window_seconds, operator, threshold):
+    """Create an alert rule and return its id"""
+    conn = get_db_connection()
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO alert_rules (account, name, metric, window_seconds, operator, threshold, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (account, name, metric, window_seconds, operator, threshold, now_epoch()))
+        _bump_alert_rules_version(conn, account)
+    conn.close()
+    return cursor.lastrowid
+
+def delete_alert_rule(account, rule_id):
+    """Delete an alert rule; returns True if it existed"""
+    conn = get_db_connection()
+    with conn:
+        cursor = conn.execute('''
+            DELETE FROM alert_rules WHERE account = ? AND id = ?
+        ''', (account, rule_id))
+        _bump_alert_rules_version(conn, account)
+    conn.close()
+    return cursor.rowcount > 0
+
+def get_alert_rules(account, enabled_only=False):
+    """Get alert rules for an account"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT id, name, metric, window_seconds, operator, threshold, enabled, active
+        FROM alert_rules
+        WHERE account = ? AND (enabled = 1 OR ? = 0)
+        ORDER BY id ASC
+    ''', (account, 1 if enabled_only else 0)).fetchall()
+    conn.close()
+    return [dict(row) for row in results]
+
+def get_alert_windows(account):
+    """Get checkpointed sliding-window state, keyed by window length"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT window_seconds, state FROM alert_windows WHERE account = ?
+    ''', (account,)).fetchall()
+    conn.close()
+    return {row['window_seconds']: row['state'] for row in results}
+
+def save_alert_checkpoint(account, window_states, active_changes):
+    """Checkpoint window state and rule active flags in one transaction"""
+    now = now_epoch()
+    conn = get_db_connection()
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO alert_windows (account, window_seconds, state, updated_at)
+            VALUES (?, ?, ?, ?)
+        ''', [(account, window, state, now) for window, state in window_states.items()])
+        conn.executemany('''
+            UPDATE alert_rules SET active = ? WHERE id = ?
+        ''', [(1 if active else 0, rule_id) for rule_id, active in active_changes.items()])
+    conn.close()
+
+def get_follower_samples_since(since):
+    """Get (timestamp, follower_count) samples since an epoch time, oldest first"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT timestamp, follower_count FROM followers
+        WHERE timestamp >= ?
+        ORDER BY timestamp ASC
+    ''', (since,)).fetchall()
+    conn.close()
+    return [(row['timestamp'], row['follower_count']) for row in results]
+
+def save_connection_snapshot(account, kind, user_ids_blob, count):
+    """Store the packed, sorted user id list for followers or followees"""
+    conn = get_db_connection()
+    with conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO connection_snapshots (account, kind, user_ids, count, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (account, kind, user_ids_blob, count, now_epoch()))
+    conn.close()
+
+def get_connection_snapshot(account, kind):
+    """Get a stored connection snapshot (user_ids blob, count, timestamp) or None"""
+    conn = get_db_connection()
+    result = conn.execute('''
+        SELECT user_ids, count, timestamp FROM connection_snapshots
+        WHERE account = ? AND kind = ?
+    ''', (account, kind)).fetchone()
+    conn.close()
+    return dict(result) if result else None
+
+def save_connection_relations(account, relations):
+    """Store derived relations ({kind: packed ids blob}) in one transaction"""
+    now = now_epoch()
+    conn = get_db_connection()
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO connection_snapshots (account, kind, user_ids, count, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(account, kind, blob, len(blob) // 8, now) for kind, blob in relations.items()])
+    conn.close()
+
+def get_connection_counts(account):
+    """Get the id count of every stored snapshot for an account, by kind"""
+    conn = get_db_connection()
+    results = conn.execute('''
+        SELECT kind, count FROM connection_snapshots WHERE account = ?
+    ''', (account,)).fetchall()
+    conn.close()
+    return {row['kind']: row['count'] for row in results}
+
+def get_connection_slice(account, kind, offset, limit):
+    """Get (packed ids blob, total count) for ids offset..offset+limit of a snapshot, or None"""
+    conn = get_db_connection()
+    # Slice the int64 blob in SQLite so only the page leaves the database
+    result = conn.execute('''
+        SELECT substr(user_ids, ?, ?) AS user_ids, count FROM connection_snapshots
+        WHERE account = ? AND kind = ?
+    ''', (offset * 8 + 1, limit * 8, account, kind)).fetchone()
+    conn.close()
+    return (result['user_ids'], result['count']) if result else None
+
+def save_instagram_users(users):
+    """Insert or update (user_id, username) pairs"""
+    conn = get_db_connection()
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO instagram_users (user_id, username) VALUES (?, ?)
+        ''', users)
+    conn.close()
+
+def get_usernames(user_ids):
+    """Map user ids to usernames"""
+    usernames = {}
+    conn = get_db_connection()
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(user_ids), 500):
+        chunk = list(user_ids[start:start + 500])
+        placeholders = ','.join('?' * len(chunk))
+        for row in conn.execute(
+            f'SELECT user_id, username FROM instagram_users WHERE user_id IN ({placeholders})', chunk
+        ):
+            usernames[row['user_id']] = row['username']
+    conn.close()
+    return usernames
+
+def query_all_shards(select_sql, params=(), accounts=None):
+    """Run a query against every account shard and return rows tagged with account.
+
+    select_sql must refer to tables as {db}.table. Shards are ATTACHed in
+    groups of SHARD_ATTACH_GROUP (clamped to SQLite's limit of 10) and
+    combined with UNION ALL, so each group costs one query regardless of
+    how the accounts are split.
+    """
+    accounts = list_shard_accounts() if accounts is None else accounts
+    group_size = max(1, min(SHARD_ATTACH_GROUP, SQLITE_MAX_ATTACHED))
+    results = []
+    for start in range(0, len(accounts), group_size):
+        group = accounts[start:start + group_size]
+        conn = sqlite3.connect(':memory:')
+        conn.row_factory = sqlite3.Row
+        try:
+            parts = []
+            group_params = []
+            for i, account in enumerate(group):
+                alias = f's{i}'
+                conn.execute('ATTACH DATABASE ? AS ' + alias, (get_shard_path(account),))
+                parts.append(f'SELECT ? AS account, * FROM ({select_sql.format(db=alias)})')
+                group_params.extend((account, *params))
+            rows = conn.execute(' UNION ALL '.join(parts), group_params).fetchall()
+            results.extend(_rows_with_timestamps(rows, 'timestamp'))
+        finally:
+            conn.close()
+    return results
+
+def get_accounts_overview():
+    """Get the latest follower stats for every account shard"""
+    return query_all_shards('''
+        SELECT follower_count, following_count, posts_count, timestamp
+        FROM (SELECT * FROM {db}.followers ORDER BY id DESC LIMIT 1)
+    ''')
+
+def drop_legacy_columns(conn):
+    """Drop LEGACY_COLUMNS from an older database; returns how many were dropped.
+
+    Each drop rewrites its table, so this belongs with a full VACUUM rather
+    than with the online migration.
+    """
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        logger.info(f"SQLite {sqlite3.sqlite_version} cannot drop columns - keeping legacy columns")
+        return 0
+    dropped = 0
+    for table, columns in LEGACY_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for column in columns:
+            if column in existing:
+                conn.execute(f'ALTER TABLE {table} DROP COLUMN {column}')
+                dropped += 1
+    return dropped
+
+def migrate_timestamps(batch_size=MIGRATION_BATCH_SIZE, max_batches=None):
+    """Convert text datetime columns to integer UTC epoch seconds.
+
+    Rows are converted newest first in rowid ranges of batch_size, each
+    range in its own short transaction, so other processes keep working
+    while a large database is migrated. At most max_batches ranges are
+    converted per call (None = until done); progress is kept in settings,
+    so the next call resumes where this one stopped. Returns the number of
+    rows converted.
+    """
+    conn = get_db_connection()
+    try:
+        done = conn.execute(
+            "SELECT value FROM settings WHERE key = 'timestamp_format'"
+        ).fetchone()
+        if done and done['value'] == 'epoch':
+            return 0
+        
+        converted = 0
+        batches = 0
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            # Naive text timestamps were written in local time
+            assignments = ', '.join(f"{column} = {epoch_sql(column)}" for column in columns)
+            text_check = ' OR '.join(f"typeof({column}) = 'text'" for column in columns)
+            
+            # Rowids above the first recorded high mark were written as epoch
+            progress_key = f'timestamp_migration:{table}'
+            progress = conn.execute('SELECT value FROM settings WHERE key = ?', (progress_key,)).fetchone()
+            if progress is not None:
+                high = int(progress['value'])
+            else:
+                high = conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+            
+            while high > 0:
+                if max_batches is not None and batches >= max_batches:
+                    logger.info(f"Timestamp migration paused after {converted} rows - "
+                                "run 'python -m bot migrate' to finish")
+                    return converted
+                low = max(high - batch_size, 0)
+                with conn:
+                    cursor = conn.execute(f'''
+                        UPDATE {table} SET {assignments}
+                        WHERE rowid > ? AND rowid <= ? AND ({text_check})
+                    ''', (low, high))
+                    conn.execute('''
+                        INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, ?)
+                    ''', (progress_key, str(low), now_epoch()))
+                converted += cursor.rowcount
+                batches += 1
+                high = low
+        
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO settings (key, value, updated_at)
+                VALUES ('timestamp_format', 'epoch', ?)
+            ''', (now_epoch(),))
+            conn.execute("DELETE FROM settings WHERE key LIKE 'timestamp_migration:%'")
+        if converted:
+            logger.info(f"Migrated {converted} rows to epoch timestamps")
+        return converted
+    finally:
+        conn.close()
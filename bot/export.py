@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timezone
+from .db import get_db_connection, use_account, to_epoch, format_timestamp, epoch_sql
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = {
+    'followers': ['id', 'timestamp', 'follower_count', 'following_count', 'posts_count'],
+    'follower_changes': ['id', 'timestamp', 'change_type', 'count', 'message'],
+    'tracking_log': ['id', 'timestamp', 'status', 'message', 'details'],
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+def parse_time_bound(value):
+    """Parse an ISO date/datetime string used as an export range bound.
+
+    Values without a UTC offset are interpreted as local time.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (expected ISO format, e.g. 2024-01-31)")
+
+def iter_batches(table, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield rows of a table in fixed-size batches.
+
+    Uses keyset pagination on the primary key and a short read per batch, so
+    memory stays constant and no read lock is held between batches.
+    Timestamps are always epoch seconds, also for rows still stored as text
+    while the timestamp migration is running.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+
+    columns = EXPORT_TABLES[table]
+    timestamp = epoch_sql('timestamp')
+    where = ['id > ?']
+    bounds = []
+    if start is not None:
+        where.append(f'{timestamp} >= ?')
+        bounds.append(to_epoch(parse_time_bound(start)))
+    if end is not None:
+        where.append(f'{timestamp} < ?')
+        bounds.append(to_epoch(parse_time_bound(end)))
+
+    selected = [f'{timestamp} AS timestamp' if name == 'timestamp' else name for name in columns]
+    query = f'''
+        SELECT {', '.join(selected)} FROM {table}
+        WHERE {' AND '.join(where)}
+        ORDER BY id ASC LIMIT ?
+    '''
+
+    last_id = 0
+    while True:
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(query, (last_id, *bounds, batch_size)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]['id']
+
+def _format_batch(table, batch):
+    """Render epoch timestamps in a batch as ISO 8601 UTC strings"""
+    index = EXPORT_TABLES[table].index('timestamp')
+    return [row[:index] + (format_timestamp(row[index], timezone.utc),) + row[index + 1:]
+            for row in batch]
+
+def stream_csv(table, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield CSV text chunks, one per batch, starting with the header"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_TABLES[table])
+    yield buffer.getvalue()
+
+    for batch in iter_batches(table, start, end, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_format_batch(table, batch))
+        yield buffer.getvalue()
+
+def stream_ndjson(table, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield newline-delimited JSON chunks, one per batch"""
+    columns = EXPORT_TABLES[table]
+    for batch in iter_batches(table, start, end, batch_size):
+        yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in _format_batch(table, batch))
+
+def write_parquet(table, destination, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Write a table to a Parquet file, one row group per batch.
+
+    Requires the optional pyarrow package.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    columns = EXPORT_TABLES[table]
+    integer_columns = {'id', 'follower_count', 'following_count', 'posts_count', 'count'}
+    schema = pa.schema([
+        (name, pa.timestamp('s', tz='UTC') if name == 'timestamp'
+         else pa.int64() if name in integer_columns else pa.string())
+        for name in columns
+    ])
+
+    rows_written = 0
+    with pq.ParquetWriter(destination, schema) as writer:
+        for batch in iter_batches(table, start, end, batch_size):
+            data = {name: [row[i] for row in batch] for i, name in enumerate(columns)}
+            writer.write_batch(pa.RecordBatch.from_pydict(data, schema=schema))
+            rows_written += len(batch)
+
+    logger.info(f"Exported {rows_written} rows from {table} to Parquet")
+    return rows_written
+
+def export_to_file(table, path, fmt='csv', start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Export a table to a file in the given format"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet':
+        return write_parquet(table, path, start, end, batch_size)
+
+    stream = stream_csv if fmt == 'csv' else stream_ndjson
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for chunk in stream(table, start, end, batch_size):
+            f.write(chunk)
+    logger.info(f"Exported {table} to {path} ({fmt})")
+
+def main(argv=None, prog=None):
+    """Command line entry point for exports"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(prog=prog, description='Export Instagram Analytics history')
+    parser.add_argument('table', choices=sorted(EXPORT_TABLES))
+    parser.add_argument('--format', dest='fmt', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--start', help='Start of range (ISO date/datetime, inclusive)')
+    parser.add_argument('--end', help='End of range (ISO date/datetime, exclusive)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('-o', '--output', help='Output file (default: stdout, not for parquet)')
+    parser.add_argument('--account', help='Account shard to export (STORAGE_MODE=sharded)')
+    args = parser.parse_args(argv)
+
+    try:
+        with use_account(args.account):
+            if args.output:
+                export_to_file(args.table, args.output, args.fmt, args.start, args.end, args.batch_size)
+            elif args.fmt == 'parquet':
+                parser.error('--output is required for parquet exports')
+            else:
+                stream = stream_csv if args.fmt == 'csv' else stream_ndjson
+                for chunk in stream(args.table, args.start, args.end, args.batch_size):
+                    sys.stdout.write(chunk)
+    except (ValueError, RuntimeError) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
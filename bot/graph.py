@@ -0,0 +1,189 @@
+import logging
+import contextvars
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from .db import (
+    save_connection_snapshot, save_follower_snapshot, get_connection_snapshot,
+    save_connection_relations, get_connection_counts, get_connection_slice,
+    save_instagram_users, get_usernames, get_setting, log_tracking_event
+)
+
+logger = logging.getLogger(__name__)
+
+FOLLOWERS = 'followers'
+FOLLOWEES = 'followees'
+RELATIONS = ('mutuals', 'not_following_back', 'fans')
+
+# Usernames are written to the database in batches while the lists stream in
+USER_BATCH_SIZE = 1000
+
+def pack_ids(ids):
+    """Pack sorted user ids as a compact int64 blob"""
+    return array('q', ids).tobytes()
+
+def unpack_ids(blob):
+    """Unpack an int64 blob into an array of user ids"""
+    ids = array('q')
+    ids.frombytes(blob)
+    return ids
+
+def merge_join(left, right):
+    """Split two sorted id sequences into (in both, only left, only right).
+
+    A single linear pass over both inputs; no sets or string hashing, so
+    memory stays at the size of the outputs.
+    """
+    both, only_left, only_right = array('q'), array('q'), array('q')
+    i = j = 0
+    len_left, len_right = len(left), len(right)
+    while i < len_left and j < len_right:
+        a, b = left[i], right[j]
+        if a == b:
+            both.append(a)
+            i += 1
+            j += 1
+        elif a < b:
+            only_left.append(a)
+            i += 1
+        else:
+            only_right.append(b)
+            j += 1
+    only_left.extend(left[i:])
+    only_right.extend(right[j:])
+    return both, only_left, only_right
+
+def _collect(get_iterator, limit):
+    """Stream a profile list, storing usernames as it goes.
+
+    Returns (sorted ids, complete); complete is False when the list was
+    cut short at limit.
+    """
+    ids = array('q')
+    batch = []
+    complete = True
+    # The iterator fetches its first page on creation, so create it in the worker
+    for user in get_iterator():
+        if limit and len(ids) >= limit:
+            complete = False
+            break
+        ids.append(user.userid)
+        batch.append((user.userid, user.username))
+        if len(batch) >= USER_BATCH_SIZE:
+            save_instagram_users(batch)
+            batch = []
+    if batch:
+        save_instagram_users(batch)
+    return _sorted_unique(ids), complete
+
+def _sorted_unique(ids):
+    """Sort ids and drop duplicates (pages can overlap while a list changes)"""
+    result = array('q')
+    for user_id in sorted(ids):
+        if not result or result[-1] != user_id:
+            result.append(user_id)
+    return result
+
+def fetch_connections(profile, limit=0, followees=True):
+    """Fetch followers (and followees) concurrently.
+
+    Returns ((follower ids, complete), (followee ids, complete)); the
+    second item is None when followees=False.
+    """
+    # Each worker gets a copy of the caller's context so shard routing carries over
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='graph') as executor:
+        followers = executor.submit(contextvars.copy_context().run, _collect, profile.get_followers, limit)
+        if not followees:
+            return followers.result(), None
+        followees = executor.submit(contextvars.copy_context().run, _collect, profile.get_followees, limit)
+        return followers.result(), followees.result()
+
+def load_connections(account, kind):
+    """Load a stored id array, or an empty array if never fetched"""
+    snapshot = get_connection_snapshot(account, kind)
+    return unpack_ids(snapshot['user_ids']) if snapshot else array('q')
+
+def analyze_connections(account, followers=None, followees=None):
+    """Compute mutuals, non-followbacks and fans from stored snapshots"""
+    if followers is None:
+        followers = load_connections(account, FOLLOWERS)
+    if followees is None:
+        followees = load_connections(account, FOLLOWEES)
+    mutuals, fans, not_following_back = merge_join(followers, followees)
+    return {
+        'mutuals': mutuals,
+        'not_following_back': not_following_back,  # you follow them, they don't follow you
+        'fans': fans,                              # they follow you, you don't follow them
+    }
+
+def update_relations(account, followers=None, followees=None):
+    """Recompute and store the relations after a snapshot changed.
+
+    Runs once per snapshot so API pages only slice the stored arrays.
+    Does nothing until the following list has been fetched.
+    """
+    if followees is None and get_connection_snapshot(account, FOLLOWEES) is None:
+        return False
+    relations = analyze_connections(account, followers, followees)
+    save_connection_relations(account, {kind: pack_ids(ids) for kind, ids in relations.items()})
+    return True
+
+def _ensure_relations(account, counts):
+    """Compute relations for snapshots stored before they were precomputed"""
+    if RELATIONS[0] not in counts and FOLLOWEES in counts and update_relations(account):
+        counts = get_connection_counts(account)
+    return counts
+
+def connection_summary(account):
+    """Counts of each relation, from the stored arrays"""
+    counts = _ensure_relations(account, get_connection_counts(account))
+    return {relation: counts.get(relation, 0) for relation in RELATIONS}
+
+def connection_page(account, relation, offset=0, limit=100):
+    """Get one page of usernames for a relation"""
+    _ensure_relations(account, get_connection_counts(account))
+    stored = get_connection_slice(account, relation, offset, limit)
+    if stored is None:
+        return {'total': 0, 'users': []}
+    blob, total = stored
+    page = unpack_ids(blob)
+    usernames = get_usernames(page)
+    return {
+        'total': total,
+        'users': [{'user_id': user_id, 'username': usernames.get(user_id)} for user_id in page]
+    }
+
+def save_followers(account, followers, complete=True):
+    """Store a follower id snapshot, recording follows/unfollows since the last one.
+
+    Events are only recorded when both lists are complete; the first
+    snapshot is the baseline and records none.
+    """
+    previous = get_connection_snapshot(account, FOLLOWERS)
+    new_followers, unfollowers = array('q'), array('q')
+    if complete and previous and get_setting(f'followers_snapshot:{account}') == 'complete':
+        _, unfollowers, new_followers = merge_join(unpack_ids(previous['user_ids']), followers)
+    save_follower_snapshot(account, pack_ids(followers), len(followers), complete,
+                           new_followers, unfollowers)
+    return new_followers, unfollowers
+
+def track_connections(profile, account, limit=0, followees=True):
+    """Fetch and store the follower list, and the following list if followees=True"""
+    try:
+        (followers, complete), following = fetch_connections(profile, limit, followees)
+        new_followers, unfollowers = save_followers(account, followers, complete)
+        if following is not None:
+            following = following[0]
+            save_connection_snapshot(account, FOLLOWEES, pack_ids(following), len(following))
+        update_relations(account, followers, following)
+        
+        message = f'{len(followers)} followers'
+        if following is not None:
+            message += f', {len(following)} following'
+        logger.info(f"Stored connections: {message}; "
+                    f"{len(new_followers)} follows, {len(unfollowers)} unfollows")
+        log_tracking_event('success', f'Connections updated - {message}')
+        return True
+    except Exception as e:
+        logger.error(f"Failed to fetch connections: {str(e)}")
+        log_tracking_event('error', 'Failed to fetch connections', str(e))
+        return False
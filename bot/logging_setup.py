@@ -0,0 +1,29 @@
+import os
+import logging
+from .config import LOG_LEVEL, LOG_DIR
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_configured = set()
+
+def setup_logging(log_name):
+    """Configure root logging to stderr and logs/<log_name>.
+
+    Called from entry points rather than at import time, so importing a
+    module never touches the filesystem. Safe to call more than once.
+    """
+    if log_name in _configured:
+        return
+    
+    root = logging.getLogger()
+    if not _configured:
+        root.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(stream_handler)
+    
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = logging.FileHandler(os.path.join(LOG_DIR, f'{log_name}.log'))
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(file_handler)
+    _configured.add(log_name)
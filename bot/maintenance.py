@@ -0,0 +1,143 @@
+import logging
+from .db import (
+    get_db_connection, get_setting, save_setting, now_epoch, utc_offset_seconds,
+    log_tracking_event, migrate_timestamps, drop_legacy_columns
+)
+from .config import (
+    RAW_RETENTION_DAYS, HOURLY_RETENTION_DAYS, TRACKING_LOG_RETENTION_DAYS,
+    VACUUM_PAGES
+)
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+HOUR = 3600
+
+# Rows deleted per transaction, so the tracker is never blocked for long
+DELETE_BATCH_SIZE = 5000
+
+def _compact_range(conn, start, end, bucket_seconds, offset):
+    """Keep only the last follower sample per bucket in [start, end)"""
+    with conn:
+        cursor = conn.execute('''
+            DELETE FROM followers
+            WHERE timestamp >= ? AND timestamp < ?
+              AND id NOT IN (
+                  SELECT MAX(id) FROM followers
+                  WHERE timestamp >= ? AND timestamp < ?
+                  GROUP BY (timestamp + ?) / ?
+              )
+        ''', (start, end, start, end, offset, bucket_seconds))
+    return cursor.rowcount
+
+def downsample_followers(tier, older_than, bucket_seconds, offset=0):
+    """Compact follower samples older than a cutoff to one per bucket.
+
+    Work is done one day per transaction, resuming from where the previous
+    run stopped (stored in settings), so each run only touches new data.
+    """
+    key = f'retention_{tier}_until'
+    conn = get_db_connection()
+    try:
+        done_until = get_setting(key)
+        if done_until is None:
+            first = conn.execute('SELECT MIN(timestamp) FROM followers').fetchone()[0]
+            if first is None:
+                return 0
+            done_until = first
+        start = int(done_until)
+        # Align to bucket boundaries so a bucket is never split between runs
+        start -= (start + offset) % bucket_seconds
+        cutoff = older_than - (older_than + offset) % bucket_seconds
+
+        removed = 0
+        while start < cutoff:
+            end = min(start + DAY, cutoff)
+            removed += _compact_range(conn, start, end, bucket_seconds, offset)
+            start = end
+    finally:
+        conn.close()
+
+    if start > int(done_until):
+        save_setting(key, str(start))
+    return removed
+
+def expire_tracking_logs(older_than):
+    """Delete tracking log rows older than a cutoff, in batches"""
+    conn = get_db_connection()
+    removed = 0
+    try:
+        while True:
+            with conn:
+                cursor = conn.execute('''
+                    DELETE FROM tracking_log WHERE id IN (
+                        SELECT id FROM tracking_log WHERE timestamp < ? LIMIT ?
+                    )
+                ''', (older_than, DELETE_BATCH_SIZE))
+            removed += cursor.rowcount
+            if cursor.rowcount < DELETE_BATCH_SIZE:
+                break
+    finally:
+        conn.close()
+    return removed
+
+def vacuum(full=False):
+    """Return free pages to the filesystem.
+
+    Databases created before incremental auto-vacuum was enabled need one
+    full VACUUM (full=True) to switch modes; it also drops columns older
+    versions stored (see drop_legacy_columns). After that every run only
+    releases up to VACUUM_PAGES pages.
+    """
+    conn = get_db_connection()
+    conn.isolation_level = None
+    try:
+        if full:
+            dropped = drop_legacy_columns(conn)
+            if dropped:
+                logger.info(f"Dropped {dropped} legacy columns")
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            return 0
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if mode != 2:
+            logger.info("Incremental vacuum not enabled - run 'python -m bot maintenance --full-vacuum' once")
+            return 0
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        # executescript runs the pragma to completion (execute frees one page per step)
+        conn.executescript(f'PRAGMA incremental_vacuum({int(VACUUM_PAGES)});')
+        return min(free_pages, VACUUM_PAGES)
+    finally:
+        conn.close()
+
+def run_maintenance(full_vacuum=False):
+    """Apply the retention policy: downsample, expire logs, vacuum"""
+    try:
+        now = now_epoch()
+        stats = {
+            # Finish any timestamp conversion left over from startup first;
+            # the retention cutoffs below compare epoch values
+            'timestamps_migrated': migrate_timestamps(),
+            'hourly_removed': 0,
+            'daily_removed': 0,
+            'logs_removed': 0,
+        }
+        if RAW_RETENTION_DAYS > 0:
+            stats['hourly_removed'] = downsample_followers('hourly', now - RAW_RETENTION_DAYS * DAY, HOUR)
+        if HOURLY_RETENTION_DAYS > 0:
+            # Daily buckets follow local midnight, matching the dashboard timeline
+            stats['daily_removed'] = downsample_followers(
+                'daily', now - HOURLY_RETENTION_DAYS * DAY, DAY, utc_offset_seconds()
+            )
+        if TRACKING_LOG_RETENTION_DAYS > 0:
+            stats['logs_removed'] = expire_tracking_logs(now - TRACKING_LOG_RETENTION_DAYS * DAY)
+        stats['pages_released'] = vacuum(full_vacuum)
+
+        logger.info(f"Maintenance completed: {stats}")
+        log_tracking_event('success', 'Maintenance completed',
+                           ', '.join(f'{key}={value}' for key, value in stats.items()))
+        return stats
+    except Exception as e:
+        logger.error(f"Maintenance failed: {str(e)}")
+        log_tracking_event('error', 'Maintenance failed', str(e))
+        return None
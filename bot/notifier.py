@@ -1,7 +1,5 @@
 import asyncio
 import logging
-from telegram import Bot
-from telegram.error import TelegramError
 from .config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 from .db import log_tracking_event
 
@@ -14,12 +12,14 @@ class TelegramNotifier:
         self.enabled = bool(self.bot_token and self.chat_id)
         
         if self.enabled:
+            from telegram import Bot
             self.bot = Bot(token=self.bot_token)
         else:
             logger.warning("Telegram notifications disabled - missing token or chat ID")
     
     async def send_message_async(self, message):
         """Send message asynchronously"""
+        from telegram.error import TelegramError
         try:
             if not self.enabled:
                 logger.debug("Telegram not configured, skipping notification")
@@ -86,6 +86,11 @@ def get_notifier():
         _notifier = TelegramNotifier()
     return _notifier
 
+def reset_notifier():
+    """Drop the global notifier (e.g. in a freshly forked worker)"""
+    global _notifier
+    _notifier = None
+
 def send_notification(message):
     """Send notification using global notifier"""
     notifier = get_notifier()
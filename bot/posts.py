@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from .db import (
+    save_post_snapshot, get_posts_due_for_refresh, postpone_post_refresh,
+    get_setting, save_setting, log_tracking_event, now_epoch
+)
+from .config import POSTS_REFRESH_PER_CYCLE, POSTS_INITIAL_CRAWL
+from .cache import get_profile
+
+logger = logging.getLogger(__name__)
+
+# (max post age, refresh interval): young posts change fast, old ones barely move
+REFRESH_SCHEDULE = [
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(hours=6)),
+    (timedelta(days=30), timedelta(days=1)),
+    (timedelta(days=365), timedelta(days=7)),
+]
+OLDEST_REFRESH_INTERVAL = timedelta(days=30)
+
+# First retry delay after a failed refresh; doubles with every further failure
+MIN_RETRY_INTERVAL = timedelta(hours=1)
+
+# Pinned posts are listed first regardless of age
+MAX_PINNED_POSTS = 3
+
+def refresh_interval(taken_at, now=None):
+    """How long to wait before refreshing a post of this age (aware datetimes)"""
+    age = (now or datetime.now(timezone.utc)) - taken_at
+    for max_age, interval in REFRESH_SCHEDULE:
+        if age < max_age:
+            return interval
+    return OLDEST_REFRESH_INTERVAL
+
+def retry_interval(last_refreshed, now=None):
+    """Delay before retrying a failed refresh.
+
+    last_refreshed only moves on success, so the time since then doubles
+    the delay after every consecutive failure.
+    """
+    since_success = timedelta(seconds=(now or now_epoch()) - last_refreshed)
+    return min(max(since_success, MIN_RETRY_INTERVAL), OLDEST_REFRESH_INTERVAL)
+
+class PostTracker:
+    """Incremental per-post engagement tracker.
+
+    New posts are found by walking the media list only until the
+    high-watermark (newest post already stored); existing posts are
+    refreshed on an age-based schedule, a few per cycle.
+    """
+    def __init__(self, loader, username):
+        self.loader = loader
+        self.username = username
+
+    def _watermark(self):
+        shortcode = get_setting(f'posts_watermark:{self.username}')
+        taken_at = get_setting(f'posts_watermark_time:{self.username}')
+        if not shortcode or not taken_at:
+            return None, None
+        taken_at = datetime.fromisoformat(taken_at)
+        # Post.date_local is timezone-aware; treat a naive watermark as local time
+        if taken_at.tzinfo is None:
+            taken_at = taken_at.astimezone()
+        return shortcode, taken_at
+
+    def _save_watermark(self, post):
+        save_setting(f'posts_watermark:{self.username}', post.shortcode)
+        save_setting(f'posts_watermark_time:{self.username}', post.date_local.isoformat())
+
+    def _save_post(self, post):
+        taken_at = post.date_local
+        now = datetime.now(timezone.utc)
+        save_post_snapshot(
+            self.username,
+            post.shortcode,
+            taken_at,
+            post.caption,
+            post.likes,
+            post.comments,
+            now + refresh_interval(taken_at, now)
+        )
+
+    def crawl_new_posts(self, profile):
+        """Store posts newer than the high-watermark and return how many.
+
+        The media count can't be used to skip this: deleting one post and
+        publishing another leaves it unchanged. The walk stops at the
+        watermark, so a cycle with nothing new costs one page.
+        """
+        watermark_shortcode, watermark_time = self._watermark()
+        newest = None
+        found = 0
+
+        for index, post in enumerate(profile.get_posts()):
+            if post.shortcode == watermark_shortcode:
+                break
+            if watermark_time is not None and post.date_local <= watermark_time:
+                if index >= MAX_PINNED_POSTS:
+                    break
+                continue
+            if watermark_time is None and found >= POSTS_INITIAL_CRAWL:
+                break
+
+            self._save_post(post)
+            found += 1
+            if newest is None or post.date_local > newest.date_local:
+                newest = post
+
+        if newest is not None:
+            self._save_watermark(newest)
+        return found
+
+    def refresh_due_posts(self):
+        """Refresh engagement for posts whose schedule is due"""
+        import instaloader
+
+        refreshed = 0
+        for row in get_posts_due_for_refresh(self.username, POSTS_REFRESH_PER_CYCLE):
+            try:
+                post = instaloader.Post.from_shortcode(self.loader.context, row['shortcode'])
+                self._save_post(post)
+                refreshed += 1
+            except Exception as e:
+                # Deleted or private posts keep failing; back off so they
+                # don't take every refresh slot
+                retry_in = retry_interval(row['last_refreshed'])
+                postpone_post_refresh(row['shortcode'], now_epoch() + int(retry_in.total_seconds()))
+                logger.warning(f"Failed to refresh post {row['shortcode']} (retry in {retry_in}): {str(e)}")
+        return refreshed
+
+    def track(self):
+        """Run one incremental post-metrics cycle"""
+        try:
+            profile = get_profile(self.loader.context, self.username)
+            found = self.crawl_new_posts(profile)
+            refreshed = self.refresh_due_posts()
+            logger.info(f"Post tracking: {found} new, {refreshed} refreshed")
+            log_tracking_event('success', f'Post tracking completed - {found} new, {refreshed} refreshed')
+            return True
+        except Exception as e:
+            logger.error(f"Error during post tracking: {str(e)}")
+            log_tracking_event('error', 'Post tracking failed', str(e))
+            return False
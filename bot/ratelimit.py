@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+import logging
+from .config import (
+    RATE_LIMIT_DB, INSTAGRAM_REQUESTS_PER_HOUR, INSTAGRAM_BURST,
+    INTERACTIVE_RESERVE, INTERACTIVE_MAX_WAIT, BACKGROUND_MAX_WAIT
+)
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would exceed the shared Instagram budget"""
+    def __init__(self, retry_after):
+        super().__init__(f"Instagram request budget exhausted, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class RequestBudget:
+    """Token bucket shared by every process through a small SQLite file.
+
+    Tokens refill at requests_per_hour / 3600 per second up to burst.
+    Background requests may not dip into the last `reserve` tokens, so
+    interactive requests (dashboard logins, manual tracking) stay fast
+    even while the tracker is busy.
+    """
+    def __init__(self, path=RATE_LIMIT_DB, requests_per_hour=INSTAGRAM_REQUESTS_PER_HOUR,
+                 burst=INSTAGRAM_BURST, reserve=INTERACTIVE_RESERVE, name='instagram'):
+        self.path = path
+        self.rate = requests_per_hour / 3600.0
+        self.burst = float(burst)
+        self.reserve = float(min(reserve, burst - 1))
+        self.name = name
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _init_db(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO rate_buckets (name, tokens, updated_at)
+            VALUES (?, ?, ?)
+        ''', (self.name, self.burst, time.time()))
+        conn.close()
+
+    def try_acquire(self, cost=1, priority=BACKGROUND):
+        """Take tokens if available; return 0 on success or seconds to wait"""
+        floor = self.reserve if priority == BACKGROUND else 0.0
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so read-modify-write is atomic
+            conn.execute('BEGIN IMMEDIATE')
+            tokens, updated_at = conn.execute(
+                'SELECT tokens, updated_at FROM rate_buckets WHERE name = ?', (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.burst, tokens + max(now - updated_at, 0) * self.rate)
+
+            if tokens - cost >= floor:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost + floor - tokens) / self.rate
+
+            conn.execute('UPDATE rate_buckets SET tokens = ?, updated_at = ? WHERE name = ?',
+                         (tokens, now, self.name))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, cost=1, priority=BACKGROUND, max_wait=None):
+        """Wait for tokens, or raise RateLimitExceeded if the wait exceeds max_wait"""
+        if max_wait is None:
+            max_wait = INTERACTIVE_MAX_WAIT if priority == INTERACTIVE else BACKGROUND_MAX_WAIT
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            wait = self.try_acquire(cost, priority)
+            if wait == 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                logger.warning(f"Rate limit: rejecting {priority} request (wait {wait:.0f}s)")
+                raise RateLimitExceeded(wait)
+            logger.debug(f"Rate limit: {priority} request waiting {wait:.1f}s")
+            time.sleep(wait)
+
+    def available(self):
+        """Current token count (for status display)"""
+        conn = self._connect()
+        try:
+            tokens, updated_at = conn.execute(
+                'SELECT tokens, updated_at FROM rate_buckets WHERE name = ?', (self.name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return min(self.burst, tokens + max(time.time() - updated_at, 0) * self.rate)
+
+# Global request budget instance
+_request_budget = None
+
+def get_request_budget():
+    """Get global request budget instance"""
+    global _request_budget
+    if _request_budget is None:
+        _request_budget = RequestBudget()
+    return _request_budget
+
+_rate_controller_class = None
+
+def _get_rate_controller_class():
+    """Build the instaloader RateController subclass on first use"""
+    global _rate_controller_class
+    if _rate_controller_class is None:
+        import instaloader
+
+        class BudgetedRateController(instaloader.RateController):
+            """Charges every Instagram query to the shared request budget"""
+            def __init__(self, context, priority):
+                super().__init__(context)
+                self.priority = priority
+
+            def wait_before_query(self, query_type):
+                get_request_budget().acquire(priority=self.priority)
+                super().wait_before_query(query_type)
+
+        _rate_controller_class = BudgetedRateController
+    return _rate_controller_class
+
+def create_loader(priority=BACKGROUND):
+    """Create an Instaloader whose queries go through the shared request budget"""
+    import instaloader
+
+    controller_class = _get_rate_controller_class()
+    return instaloader.Instaloader(
+        rate_controller=lambda context: controller_class(context, priority)
+    )
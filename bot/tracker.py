@@ -1,39 +1,46 @@
-import instaloader
 import time
 import logging
 from datetime import datetime
-import schedule
+from functools import wraps
 from .db import (
-    init_db, save_follower_data, get_latest_follower_count, 
+    use_account, init_db, save_follower_data, get_latest_follower_count, 
     save_follower_change, log_tracking_event
 )
-from .notifier import send_notification
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/tracker.log'),
-        logging.StreamHandler()
-    ]
+from .config import (
+    FOLLOWERS_LIST_LIMIT, FOLLOWER_SNAPSHOT_INTERVAL, POST_TRACKING_INTERVAL,
+    GRAPH_TRACKING_INTERVAL, MAINTENANCE_INTERVAL
 )
+from .notifier import send_notification
+from .cache import get_profile
+from .ratelimit import BACKGROUND, INTERACTIVE, create_loader, get_request_budget
 
 logger = logging.getLogger(__name__)
 
+def account_scoped(method):
+    """Run a tracker method with database access routed to its account"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with use_account(self.username):
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class InstagramTracker:
-    def __init__(self, username, password):
-        self.loader = instaloader.Instaloader()
+    def __init__(self, username, password, priority=BACKGROUND):
+        self.loader = create_loader(priority)
+        self.priority = priority
         self.username = username
         self.password = password
         self.logged_in = False
         self.last_follower_count = 0
-        self.profile_cache = None
+        self.post_tracker = None
+        self.alert_engine = None
         
+    @account_scoped
     def login(self):
         """Login to Instagram"""
         try:
             logger.info(f"Attempting to login as {self.username}")
+            get_request_budget().acquire(priority=self.priority)
             self.loader.login(self.username, self.password)
             self.logged_in = True
             logger.info("Successfully logged into Instagram")
@@ -44,6 +51,7 @@ class InstagramTracker:
             log_tracking_event('error', 'Login failed', str(e))
             return False
     
+    @account_scoped
     def get_profile_stats(self):
         """Get profile statistics"""
         try:
@@ -51,7 +59,9 @@ class InstagramTracker:
                 if not self.login():
                     return None
             
-            profile = instaloader.Profile.from_username(self.loader.context, self.username)
+            # Start of a tracking cycle: always fetch fresh numbers; the rest
+            # of the cycle (follower list, posts, connections) reuses this
+            profile = get_profile(self.loader.context, self.username, force=True)
             
             stats = {
                 'followers': profile.followers,
@@ -73,6 +83,7 @@ class InstagramTracker:
             log_tracking_event('error', 'Failed to get profile stats', str(e))
             return None
     
+    @account_scoped
     def track_changes(self):
         """Track follower changes"""
         try:
@@ -84,11 +95,12 @@ class InstagramTracker:
             previous_followers = get_latest_follower_count()
             
             # Save current stats
-            save_follower_data(
+            timestamp = save_follower_data(
                 stats['followers'],
                 stats['following'],
                 stats['posts']
             )
+            self.check_alerts(timestamp, current_followers)
             
             # Check for changes
             if previous_followers > 0:
@@ -127,21 +139,77 @@ class InstagramTracker:
         logger.info("Starting single tracking run")
         return self.track_changes()
     
-    def get_followers_list(self):
-        """Get list of current followers"""
+    def check_alerts(self, timestamp, follower_count):
+        """Evaluate user-defined alert rules against a new follower sample"""
+        try:
+            from .alerts import AlertEngine, describe_rule
+            if self.alert_engine is None:
+                self.alert_engine = AlertEngine(self.username)
+            
+            for rule, value in self.alert_engine.observe(timestamp, follower_count):
+                unit = '%' if rule['metric'] == 'growth_rate' else ''
+                message = f"🚨 Alert '{rule['name']}': {describe_rule(rule)} (now {value:+.2f}{unit})"
+                send_notification(message)
+                log_tracking_event('warning', f"Alert triggered: {rule['name']}", message)
+                logger.info(message)
+        except Exception as e:
+            logger.error(f"Error evaluating alert rules: {str(e)}")
+            log_tracking_event('error', 'Alert evaluation failed', str(e))
+    
+    @account_scoped
+    def track_posts(self):
+        """Track per-post engagement incrementally"""
+        if not self.logged_in:
+            if not self.login():
+                return False
+        
+        if self.post_tracker is None:
+            from .posts import PostTracker
+            self.post_tracker = PostTracker(self.loader, self.username)
+        return self.post_tracker.track()
+    
+    def track_followers(self):
+        """Snapshot the full follower list and record who followed/unfollowed"""
+        return self.track_connections(followees=False)
+    
+    @account_scoped
+    def track_connections(self, limit=0, followees=True):
+        """Fetch followers and followees concurrently and store both lists"""
+        if not self.logged_in:
+            if not self.login():
+                return False
+        
+        from .graph import track_connections
+        try:
+            profile = get_profile(self.loader.context, self.username)
+        except Exception as e:
+            logger.error(f"Failed to get profile for connections: {str(e)}")
+            log_tracking_event('error', 'Failed to get profile for connections', str(e))
+            return False
+        return track_connections(profile, self.username, limit, followees)
+    
+    @account_scoped
+    def run_maintenance(self):
+        """Apply the retention policy to this account's data"""
+        from .maintenance import run_maintenance
+        return run_maintenance()
+    
+    @account_scoped
+    def get_followers_list(self, limit=FOLLOWERS_LIST_LIMIT):
+        """Get list of current followers (limit=0 fetches all)"""
         try:
             if not self.logged_in:
                 if not self.login():
                     return None
             
-            profile = instaloader.Profile.from_username(self.loader.context, self.username)
+            profile = get_profile(self.loader.context, self.username)
             followers = set()
             
             logger.info("Fetching followers list...")
             for follower in profile.get_followers():
                 followers.add(follower.username)
-                # Limit to prevent rate limiting during development
-                if len(followers) >= 100:  # Remove this limit in production
+                # Limit to prevent rate limiting on large accounts
+                if limit and len(followers) >= limit:
                     break
             
             logger.info(f"Retrieved {len(followers)} followers")
@@ -164,13 +232,25 @@ class InstagramTracker:
     
     def run_scheduled(self, interval_seconds=300):
         """Run scheduled tracking"""
+        import schedule
         logger.info(f"Starting scheduled tracking (interval: {interval_seconds} seconds)")
         
         # Schedule the tracking job
         schedule.every(interval_seconds).seconds.do(self.track_changes)
+        if POST_TRACKING_INTERVAL > 0:
+            schedule.every(POST_TRACKING_INTERVAL).seconds.do(self.track_posts)
+        if GRAPH_TRACKING_INTERVAL > 0:
+            # Also refreshes the follower snapshot
+            schedule.every(GRAPH_TRACKING_INTERVAL).seconds.do(self.track_connections)
+        elif FOLLOWER_SNAPSHOT_INTERVAL > 0:
+            schedule.every(FOLLOWER_SNAPSHOT_INTERVAL).seconds.do(self.track_followers)
+        if MAINTENANCE_INTERVAL > 0:
+            schedule.every(MAINTENANCE_INTERVAL).seconds.do(self.run_maintenance)
         
         # Run initial tracking
         self.track_changes()
+        if POST_TRACKING_INTERVAL > 0:
+            self.track_posts()
         
         # Keep running
         while True:
@@ -192,4 +272,5 @@ def create_tracker_from_session(session_data):
     if not username or not password:
         raise ValueError("Instagram credentials not found in session")
     
-    return InstagramTracker(username, password)
+    # Started from the dashboard, so it goes ahead of background tracking
+    return InstagramTracker(username, password, priority=INTERACTIVE)
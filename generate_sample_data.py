@@ -10,7 +10,7 @@ sys.path.append(os.path.dirname(__file__))
 
 from bot.db import (
     init_db, save_follower_data, save_follower_change, 
-    log_tracking_event, save_setting
+    log_tracking_event, save_setting, to_epoch
 )
 from datetime import datetime, timedelta
 import random
@@ -40,7 +40,7 @@ def generate_sample_data():
         conn.execute('''
             INSERT INTO followers (timestamp, follower_count, following_count, posts_count)
             VALUES (?, ?, ?, ?)
-        ''', (date, followers, following, posts))
+        ''', (to_epoch(date), followers, following, posts))
         conn.commit()
         conn.close()
         
@@ -54,7 +54,7 @@ def generate_sample_data():
             conn.execute('''
                 INSERT INTO follower_changes (timestamp, change_type, count, message)
                 VALUES (?, ?, ?, ?)
-            ''', (date, change_type, count, message))
+            ''', (to_epoch(date), change_type, count, message))
             conn.commit()
             conn.close()
     
@@ -74,7 +74,7 @@ def generate_sample_data():
         conn.execute('''
             INSERT INTO tracking_log (timestamp, status, message, details)
             VALUES (?, ?, ?, ?)
-        ''', (timestamp, status, message, details))
+        ''', (to_epoch(timestamp), status, message, details))
         conn.commit()
         conn.close()
     
@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration for the Instagram Analytics dashboard.
+
+    gunicorn -c gunicorn.conf.py web.wsgi:app
+
+With the app preloaded (the default), SIGHUP only restarts workers from
+the code already imported by the master, so it does not pick up code
+changes. To deploy new code without dropping requests, start a new master
+next to the old one and then retire the old one:
+
+    kill -USR2 $(cat gunicorn.pid)          # new master + workers start
+    kill -WINCH $(cat gunicorn.pid.oldbin)  # old workers finish and exit
+    kill -TERM $(cat gunicorn.pid.oldbin)   # old master exits
+
+Set WEB_PRELOAD=false to load the app in each worker instead; then
+kill -HUP $(cat gunicorn.pid) reloads code, at the cost of more memory.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# One worker per core plus one by default; override with WEB_WORKERS
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('WEB_THREADS', 2))
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = os.environ.get('WEB_PRELOAD', 'true').lower() != 'false'
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+pidfile = os.environ.get('WEB_PIDFILE', 'gunicorn.pid')
+accesslog = '-'
+
+def post_fork(server, worker):
+    """Give every worker its own caches.
+
+    State created in the master before fork (profile cache locks, the
+    Telegram client) must not be shared between processes. SQLite
+    connections are opened per call by bot.db, so none are inherited.
+    """
+    from bot.cache import reset_profile_cache
+    from bot.notifier import reset_notifier
+
+    reset_profile_cache()
+    reset_notifier()
+    server.log.info(f"Worker {worker.pid} initialized")
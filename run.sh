@@ -22,7 +22,7 @@ mkdir -p logs
 
 # Initialize database
 echo "🗄️  Initializing database..."
-python -c "from bot.db import init_db; init_db()"
+python -m bot init-db
 
 # Set Flask environment variables
 export FLASK_APP=web/app.py
@@ -41,5 +41,9 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo "================================"
 
-# Start the Flask application
-python -m web.app
+# Start the application (multi-worker gunicorn when PRODUCTION=true)
+if [ "${PRODUCTION}" = "true" ]; then
+    exec gunicorn -c gunicorn.conf.py web.wsgi:app
+else
+    python -m web.app
+fi
@@ -0,0 +1,60 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bot import db
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+
+class FollowerTimelineTest(unittest.TestCase):
+    """Days are bucketed with the UTC offset in effect at each sample"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved = (db.DATABASE_PATH, db.STORAGE_MODE, db.now_epoch)
+        db.DATABASE_PATH = os.path.join(self.tmpdir, 'analytics.db')
+        db.STORAGE_MODE = 'single'
+        db.init_db()
+
+    def tearDown(self):
+        db.DATABASE_PATH, db.STORAGE_MODE, db.now_epoch = self.saved
+        shutil.rmtree(self.tmpdir)
+
+    def _sample(self, local_time, count):
+        conn = db.get_db_connection()
+        with conn:
+            conn.execute(
+                'INSERT INTO followers (timestamp, follower_count, following_count, posts_count) VALUES (?, ?, 0, 0)',
+                (int(local_time.timestamp()), count)
+            )
+        conn.close()
+
+    def test_late_evening_samples_across_dst(self):
+        # "Now" is in daylight time; the January sample is in standard time
+        db.now_epoch = lambda: int(datetime(2024, 7, 20, 12, 0, tzinfo=NEW_YORK).timestamp())
+        self._sample(datetime(2024, 1, 10, 23, 30, tzinfo=NEW_YORK), 100)
+        self._sample(datetime(2024, 7, 1, 23, 30, tzinfo=NEW_YORK), 200)
+
+        timeline = db.get_follower_timeline(365, tz=NEW_YORK)
+
+        self.assertEqual([(row['date'], row['followers']) for row in timeline],
+                         [('2024-01-10', 100), ('2024-07-01', 200)])
+
+    def test_offset_segments_split_at_transitions(self):
+        start = int(datetime(2024, 1, 1, tzinfo=NEW_YORK).timestamp())
+        end = int(datetime(2024, 12, 31, tzinfo=NEW_YORK).timestamp())
+
+        segments = db.utc_offset_segments(start, end, NEW_YORK)
+
+        self.assertEqual([offset for _, offset in segments], [-18000, -14400, -18000])
+        self.assertEqual(segments[1][0], int(datetime(2024, 3, 10, 7, 0, tzinfo=ZoneInfo('UTC')).timestamp()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bot import db
+
+
+class MigrateTimestampsTest(unittest.TestCase):
+    """Text timestamps from older versions were written in local time"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved = (db.DATABASE_PATH, db.STORAGE_MODE, os.environ.get('TZ'))
+        db.DATABASE_PATH = os.path.join(self.tmpdir, 'analytics.db')
+        db.STORAGE_MODE = 'single'
+        os.environ['TZ'] = 'America/New_York'
+        time.tzset()
+
+        conn = db.get_db_connection()
+        db.create_schema(conn)
+        with conn:
+            conn.executemany(
+                'INSERT INTO followers (timestamp, follower_count, following_count, posts_count) VALUES (?, ?, ?, ?)',
+                [('2024-01-15 12:00:00', 100, 10, 1),   # EST, UTC-5
+                 ('2024-07-15 12:00:00', 110, 10, 1),   # EDT, UTC-4
+                 ('2024-07-15T12:30:00.250000', 111, 10, 1),
+                 (1721062800, 112, 10, 1)]
+            )
+            conn.execute("INSERT INTO tracking_log (timestamp, status, message) VALUES ('2024-01-15 12:00:00', 'success', 'old')")
+        conn.close()
+
+    def tearDown(self):
+        db.DATABASE_PATH, db.STORAGE_MODE, tz = self.saved
+        if tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = tz
+        time.tzset()
+        shutil.rmtree(self.tmpdir)
+
+    def _timestamps(self, table):
+        conn = db.get_db_connection()
+        rows = conn.execute(f'SELECT timestamp FROM {table} ORDER BY id').fetchall()
+        conn.close()
+        return [row['timestamp'] for row in rows]
+
+    def _epoch(self, *args):
+        return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+    def test_local_text_converted_to_utc_epoch(self):
+        converted = db.migrate_timestamps()
+
+        self.assertEqual(converted, 4)
+        self.assertEqual(self._timestamps('followers'), [
+            self._epoch(2024, 1, 15, 17, 0),
+            self._epoch(2024, 7, 15, 16, 0),
+            self._epoch(2024, 7, 15, 16, 30),
+            1721062800,
+        ])
+        self.assertEqual(self._timestamps('tracking_log'), [self._epoch(2024, 1, 15, 17, 0)])
+        self.assertEqual(db.get_setting('timestamp_format'), 'epoch')
+
+    def test_resumes_after_max_batches(self):
+        # Newest rows first; the newest row was already an epoch value
+        self.assertEqual(db.migrate_timestamps(batch_size=1, max_batches=2), 1)
+        self.assertEqual([type(value) for value in self._timestamps('followers')], [str, str, int, int])
+        self.assertIsNone(db.get_setting('timestamp_format'))
+
+        self.assertEqual(db.migrate_timestamps(batch_size=1), 3)
+        self.assertTrue(all(isinstance(value, int) for value in self._timestamps('followers')))
+        self.assertEqual(db.get_setting('timestamp_format'), 'epoch')
+        self.assertEqual(db.migrate_timestamps(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
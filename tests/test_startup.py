@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+import importlib.util
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Import time budget for 'python -m bot init-db', in milliseconds
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 100))
+
+HEAVY_MODULES = ('instaloader', 'schedule', 'telegram')
+
+
+def run_python(*args, env=None):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def loaded_heavy_modules(statement):
+    """Heavy modules present in sys.modules after running an import statement"""
+    result = run_python('-c', f"{statement}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_init_db_import_time(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, DATABASE_PATH=os.path.join(tmpdir, 'analytics.db'))
+            result = run_python('-X', 'importtime', '-m', 'bot', 'init-db', env=env)
+
+        # Lines look like "import time:  self [us] | cumulative | package";
+        # top-level imports are not indented, so their cumulative times add
+        # up. Interpreter startup (everything up to runpy) is not counted.
+        total_us = 0
+        imported = set()
+        counting = False
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            imported.add(name.strip())
+            if counting and not name.startswith('  '):
+                total_us += int(cumulative)
+            if name.strip() == 'runpy':
+                counting = True
+
+        self.assertFalse(imported & set(HEAVY_MODULES))
+        self.assertLess(total_us / 1000, STARTUP_BUDGET_MS)
+
+    def test_tracker_import_is_light(self):
+        self.assertEqual(loaded_heavy_modules('import bot.tracker'), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('flask'), 'flask not installed')
+    def test_web_app_import_is_light(self):
+        self.assertEqual(loaded_heavy_modules('import web.app'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
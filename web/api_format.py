@@ -0,0 +1,120 @@
+import gzip
+import zlib
+import logging
+from datetime import date
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson, falling back to the stdlib"""
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+def wants_columnar():
+    """Whether the client asked for columnar responses (?format=columnar)"""
+    return request.args.get('format') == 'columnar'
+
+def delta_encode(values):
+    """Encode a sorted-ish integer sequence as a start value and successive deltas"""
+    if not values:
+        return {'start': None, 'deltas': []}
+    deltas = [0] * len(values)
+    for i in range(1, len(values)):
+        deltas[i] = values[i] - values[i - 1]
+    return {'start': values[0], 'deltas': deltas}
+
+def encode_dates(values):
+    """Delta-encode ISO dates (YYYY-MM-DD) as a start date and day offsets"""
+    if not values:
+        return {'start': None, 'deltas': []}
+    ordinals = delta_encode([date.fromisoformat(value).toordinal() for value in values])
+    return {'start': values[0], 'deltas': ordinals['deltas']}
+
+def to_columnar(rows, columns):
+    """Turn a list of dicts into parallel arrays, one per column"""
+    return {column: [row[column] for row in rows] for column in columns}
+
+def columnar_envelope(columns, length):
+    """Wrap column arrays in the columnar response envelope"""
+    return {'format': 'columnar', 'length': length, 'columns': columns}
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def _compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+def compress_response(response):
+    """Compress /api/* responses with brotli or gzip when the client accepts it"""
+    if not request.path.startswith('/api/'):
+        return response
+    if response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+        return response
+    # File downloads (e.g. Parquet exports) are sent as-is
+    if response.direct_passthrough:
+        return response
+
+    encoding = _choose_encoding()
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_SIZE:
+            return response
+        if encoding == 'br':
+            response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        else:
+            response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_api_format(app):
+    """Install the fast JSON provider and response compression"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
@@ -1,24 +1,18 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, g
 from werkzeug.security import check_password_hash, generate_password_hash
 import os
 from datetime import datetime
 import logging
 from .auth import login_required, verify_instagram_credentials
 from .routes import init_routes
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/web.log'),
-        logging.StreamHandler()
-    ]
-)
+from .api_format import init_api_format
+from bot.logging_setup import setup_logging
+from bot.db import set_current_account, reset_current_account
 
 logger = logging.getLogger(__name__)
 
 def create_app():
+    setup_logging('web')
     app = Flask(__name__)
     app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
     
@@ -26,8 +20,20 @@ def create_app():
     app.config['SESSION_TYPE'] = 'filesystem'
     app.config['SESSION_PERMANENT'] = False
     
+    @app.before_request
+    def route_to_account_shard():
+        """Send this request's database access to the logged-in account"""
+        g.account_token = set_current_account(session.get('instagram_username'))
+    
+    @app.teardown_request
+    def reset_account_shard(exc):
+        token = g.pop('account_token', None)
+        if token is not None:
+            reset_current_account(token)
+    
     # Initialize routes
     init_routes(app)
+    init_api_format(app)
     
     @app.route('/')
     def index():
@@ -2,8 +2,11 @@ from functools import wraps
 from flask import session, redirect, url_for, flash
 import os
 import hashlib
-import instaloader
 import logging
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from bot.cache import get_profile
+from bot.ratelimit import INTERACTIVE, create_loader, get_request_budget
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +23,12 @@ def login_required(f):
 def verify_instagram_credentials(username, password):
     """Verify Instagram credentials by attempting to login"""
     try:
-        loader = instaloader.Instaloader()
+        loader = create_loader(INTERACTIVE)
+        get_request_budget().acquire(priority=INTERACTIVE)
         loader.login(username, password)
         
-        # Get basic profile info to verify access
-        profile = instaloader.Profile.from_username(loader.context, username)
+        # Get basic profile info to verify access (fresh fetch, shared with the tracker)
+        profile = get_profile(loader.context, username, force=True)
         
         profile_data = {
             'username': profile.username,
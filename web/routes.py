@@ -1,10 +1,21 @@
-from flask import render_template, jsonify, request, session
+from flask import render_template, jsonify, request, session, Response, stream_with_context, send_file
 from .auth import login_required
 import sys
 import os
 import logging
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from bot.db import get_today_stats, get_follower_timeline, get_recent_changes, get_tracking_logs
+from bot.db import (
+    get_today_stats, get_follower_timeline, get_recent_changes, get_tracking_logs,
+    get_unfollowers_since, get_repeat_unfollowers, get_follower_history, get_user_id,
+    get_post_engagement, get_post_metrics_history, is_sharded, get_accounts_overview,
+    use_account, get_alert_rules, create_alert_rule, delete_alert_rule
+)
+from bot.config import ADMIN_ACCOUNTS
+from bot.alerts import METRICS, OPERATORS, describe_rule
+from bot.graph import connection_page, connection_summary
+from bot.cohorts import cohort_retention
+from .api_format import wants_columnar, columnar_envelope, to_columnar, delta_encode, encode_dates
+from bot.export import EXPORT_TABLES, EXPORT_FORMATS, parse_time_bound, stream_csv, stream_ndjson, write_parquet
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -39,9 +50,17 @@ def init_routes(app):
     @app.route('/api/timeline')
     @login_required
     def api_timeline():
-        """API endpoint for follower timeline data"""
+        """API endpoint for follower timeline data (?days=30, ?format=columnar)"""
         try:
-            timeline = get_follower_timeline(30)
+            days = max(1, min(request.args.get('days', 30, type=int), 3650))
+            timeline = get_follower_timeline(days)
+            
+            if wants_columnar():
+                # Parallel arrays; dates as a start date plus day offsets
+                return jsonify(columnar_envelope({
+                    'date': encode_dates([item['date'] for item in timeline]),
+                    'followers': [int(item['followers']) if item['followers'] else 0 for item in timeline]
+                }, len(timeline)))
             
             # If no data, return empty array instead of error
             if not timeline:
@@ -63,9 +82,18 @@ def init_routes(app):
     @app.route('/api/recent-changes')
     @login_required
     def api_recent_changes():
-        """API endpoint for recent follower changes"""
+        """API endpoint for recent follower changes (?limit=10, ?format=columnar)"""
         try:
-            changes = get_recent_changes(10)
+            limit = max(1, min(request.args.get('limit', 10, type=int), 1000))
+            
+            if wants_columnar():
+                # Parallel arrays; epoch timestamps as a start value plus deltas
+                changes = get_recent_changes(limit, raw_timestamps=True)
+                columns = to_columnar(changes, ('change_type', 'count', 'message'))
+                columns['timestamp'] = delta_encode([change['timestamp'] for change in changes])
+                return jsonify(columnar_envelope(columns, len(changes)))
+            
+            changes = get_recent_changes(limit)
             
             # If no data, return empty array
             if not changes:
@@ -86,6 +114,186 @@ def init_routes(app):
             logger.error(f"Error getting recent changes: {str(e)}")
             return jsonify([])  # Return empty array instead of error
     
+    @app.route('/api/unfollowers')
+    @login_required
+    def api_unfollowers():
+        """Who unfollowed in the last N days (?days=7&limit=50&before_id=)"""
+        try:
+            days = request.args.get('days', 7, type=int)
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            before_id = request.args.get('before_id', type=int)
+            since = datetime.now() - timedelta(days=days)
+            
+            events = get_unfollowers_since(session['instagram_username'], since, limit, before_id)
+            next_cursor = events[-1]['id'] if len(events) == limit else None
+            return jsonify({'unfollowers': events, 'next_before_id': next_cursor})
+        except Exception as e:
+            logger.error(f"Error getting unfollowers: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/repeat-unfollowers')
+    @login_required
+    def api_repeat_unfollowers():
+        """Users who unfollowed more than once (?min_count=2&limit=50&after=<user_id>)"""
+        try:
+            min_count = request.args.get('min_count', 2, type=int)
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            after = request.args.get('after', type=int)
+            
+            users = get_repeat_unfollowers(session['instagram_username'], min_count, limit, after)
+            next_cursor = users[-1]['user_id'] if len(users) == limit else None
+            return jsonify({'users': users, 'next_after': next_cursor})
+        except Exception as e:
+            logger.error(f"Error getting repeat unfollowers: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/follower-history/<follower_username>')
+    @login_required
+    def api_follower_history(follower_username):
+        """Follow/unfollow history for one user (?limit=50&before_id=)"""
+        try:
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            before_id = request.args.get('before_id', type=int)
+            
+            # Events are keyed by user id, so history survives username changes
+            user_id = get_user_id(follower_username)
+            if user_id is None:
+                return jsonify({'events': [], 'next_before_id': None})
+            events = get_follower_history(session['instagram_username'], user_id, limit, before_id)
+            next_cursor = events[-1]['id'] if len(events) == limit else None
+            return jsonify({'events': events, 'next_before_id': next_cursor})
+        except Exception as e:
+            logger.error(f"Error getting follower history: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/cohorts')
+    @login_required
+    def api_cohorts():
+        """Weekly follower cohort retention and median lifetime (?weeks=12)"""
+        try:
+            weeks = max(1, min(request.args.get('weeks', 12, type=int), 104))
+            return jsonify(cohort_retention(session['instagram_username'], weeks))
+        except Exception as e:
+            logger.error(f"Error getting cohorts: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/posts')
+    @login_required
+    def api_posts():
+        """Latest engagement for the most recent posts (?limit=20)"""
+        try:
+            limit = min(request.args.get('limit', 20, type=int), 200)
+            return jsonify(get_post_engagement(session['instagram_username'], limit))
+        except Exception as e:
+            logger.error(f"Error getting post engagement: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/posts/<shortcode>/metrics')
+    @login_required
+    def api_post_metrics(shortcode):
+        """Engagement history for one of the logged-in account's posts"""
+        try:
+            return jsonify(get_post_metrics_history(session['instagram_username'], shortcode))
+        except Exception as e:
+            logger.error(f"Error getting post metrics: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/accounts/overview')
+    @login_required
+    def api_accounts_overview():
+        """Latest follower stats for every tracked account (sharded storage, ADMIN_ACCOUNTS only)"""
+        # Each session is one Instagram account; other accounts' data is admin-only
+        if session['instagram_username'].lower() not in ADMIN_ACCOUNTS:
+            return jsonify({'error': 'Not allowed'}), 403
+        try:
+            if not is_sharded():
+                return jsonify({'error': 'Cross-account overview requires STORAGE_MODE=sharded'}), 400
+            return jsonify(get_accounts_overview())
+        except Exception as e:
+            logger.error(f"Error getting accounts overview: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/connections/summary')
+    @login_required
+    def api_connections_summary():
+        """Counts of mutuals, non-followbacks and fans from the last graph snapshot"""
+        try:
+            return jsonify(connection_summary(session['instagram_username']))
+        except Exception as e:
+            logger.error(f"Error getting connections summary: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/connections/<relation>')
+    @login_required
+    def api_connections(relation):
+        """Users in a relation: mutuals, not_following_back or fans (?offset=0&limit=100)"""
+        if relation not in ('mutuals', 'not_following_back', 'fans'):
+            return jsonify({'error': f'Unknown relation: {relation}'}), 404
+        try:
+            offset = max(request.args.get('offset', 0, type=int), 0)
+            limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+            return jsonify(connection_page(session['instagram_username'], relation, offset, limit))
+        except Exception as e:
+            logger.error(f"Error getting connections: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/alert-rules', methods=['GET'])
+    @login_required
+    def api_alert_rules():
+        """List alert rules for the logged-in account"""
+        try:
+            rules = get_alert_rules(session['instagram_username'])
+            for rule in rules:
+                rule['description'] = describe_rule(rule)
+            return jsonify(rules)
+        except Exception as e:
+            logger.error(f"Error getting alert rules: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/alert-rules', methods=['POST'])
+    @login_required
+    def api_create_alert_rule():
+        """Create an alert rule, e.g. {"name": "Drop", "metric": "net_change",
+        "window_seconds": 3600, "operator": "<", "threshold": -10}"""
+        data = request.get_json(silent=True) or {}
+        try:
+            name = str(data.get('name') or '').strip()
+            metric = data.get('metric')
+            operator = data.get('operator')
+            window_seconds = int(data.get('window_seconds', 0))
+            threshold = float(data.get('threshold'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'window_seconds and threshold must be numbers'}), 400
+        
+        if not name:
+            return jsonify({'error': 'name is required'}), 400
+        if metric not in METRICS:
+            return jsonify({'error': f'metric must be one of {", ".join(METRICS)}'}), 400
+        if operator not in OPERATORS:
+            return jsonify({'error': f'operator must be one of {", ".join(OPERATORS)}'}), 400
+        if window_seconds <= 0:
+            return jsonify({'error': 'window_seconds must be positive'}), 400
+        
+        try:
+            rule_id = create_alert_rule(session['instagram_username'], name, metric,
+                                        window_seconds, operator, threshold)
+            return jsonify({'id': rule_id, 'status': 'success'}), 201
+        except Exception as e:
+            logger.error(f"Error creating alert rule: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/alert-rules/<int:rule_id>', methods=['DELETE'])
+    @login_required
+    def api_delete_alert_rule(rule_id):
+        """Delete an alert rule"""
+        try:
+            if not delete_alert_rule(session['instagram_username'], rule_id):
+                return jsonify({'error': 'Alert rule not found'}), 404
+            return jsonify({'status': 'success'})
+        except Exception as e:
+            logger.error(f"Error deleting alert rule: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/settings')
     @login_required
     def settings():
@@ -210,3 +418,47 @@ def init_routes(app):
             return jsonify({'success': success, 'message': message})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/export/<table>')
+    @login_required
+    def api_export(table):
+        """Stream a table export for a time range (?format=csv|ndjson|parquet&start=&end=)"""
+        fmt = request.args.get('format', 'csv')
+        if table not in EXPORT_TABLES:
+            return jsonify({'error': f'Unknown table: {table}'}), 404
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unknown format: {fmt}'}), 400
+        
+        try:
+            start = parse_time_bound(request.args.get('start'))
+            end = parse_time_bound(request.args.get('end'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        filename = f"{table}.{fmt}"
+        try:
+            if fmt == 'parquet':
+                import tempfile
+                tmp = tempfile.TemporaryFile()
+                write_parquet(table, tmp, start, end)
+                tmp.seek(0)
+                return send_file(tmp, mimetype=EXPORT_FORMATS[fmt], as_attachment=True, download_name=filename)
+            
+            stream = stream_csv if fmt == 'csv' else stream_ndjson
+            account = session.get('instagram_username')
+            
+            def generate():
+                # Keep reading from this account's shard after the view returns
+                with use_account(account):
+                    yield from stream(table, start, end)
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype=EXPORT_FORMATS[fmt],
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 501
+        except Exception as e:
+            logger.error(f"Error exporting {table}: {str(e)}")
+            return jsonify({'error': str(e)}), 500